@@ -1,67 +1,178 @@
 """Platform adapter factory and registry."""
-from typing import Type, Dict, Optional
+import asyncio
+import importlib
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Type, Dict, Optional, Tuple
 from app.adapters.base import PlatformAdapter
-from app.adapters.grindr import GrindrAdapter
-from app.adapters.alibaba import AlibabaAdapter, AlibabaBrowserAdapter
-from app.adapters.alibaba_real import AlibabaRealAdapter, AlibabaRealBrowserAdapter
-from app.adapters.alibaba_production import AlibabaProductionAdapter
 from app.models.platform import PlatformAccount
 
+logger = logging.getLogger(__name__)
 
-# Registry of available adapters
-ADAPTER_REGISTRY: Dict[str, Type[PlatformAdapter]] = {
-    "grindr": GrindrAdapter,
-    "alibaba": AlibabaProductionAdapter,  # Use the production implementation
-    "alibaba_real": AlibabaRealAdapter,  # Keep real implementation
-    "sniffies": None,  # Placeholder for future implementation
+# Adapter classes exposed on the package, imported on first attribute access
+_LAZY = {
+    "GrindrAdapter": ("app.adapters.grindr", "GrindrAdapter"),
+    "AlibabaAdapter": ("app.adapters.alibaba", "AlibabaAdapter"),
+    "AlibabaBrowserAdapter": ("app.adapters.alibaba", "AlibabaBrowserAdapter"),
+    "AlibabaRealAdapter": ("app.adapters.alibaba_real", "AlibabaRealAdapter"),
+    "AlibabaRealBrowserAdapter": ("app.adapters.alibaba_real", "AlibabaRealBrowserAdapter"),
+    "AlibabaProductionAdapter": ("app.adapters.alibaba_production", "AlibabaProductionAdapter"),
 }
 
-# Browser-based fallback adapters
-BROWSER_ADAPTER_REGISTRY: Dict[str, Type[PlatformAdapter]] = {
-    "alibaba": AlibabaProductionAdapter,  # Use the production browser implementation
-    "alibaba_real": AlibabaRealBrowserAdapter,  # Keep real browser implementation
-    # Add other browser adapters as needed
+
+def __getattr__(name: str):
+    spec = _LAZY.get(name)
+    if spec:
+        module = importlib.import_module(spec[0])
+        obj = getattr(module, spec[1])
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazyImport:
+    """Proxy for an adapter class that imports its module on first call."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._obj = None
+
+    def _resolve(self) -> Type[PlatformAdapter]:
+        if self._obj is None:
+            module_path, _, attr = self._path.rpartition(".")
+            self._obj = getattr(importlib.import_module(module_path), attr)
+        return self._obj
+
+    def __call__(self, *args, **kwargs) -> PlatformAdapter:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"LazyImport({self._path!r})"
+
+
+_ALIBABA_PRODUCTION = LazyImport("app.adapters.alibaba_production.AlibabaProductionAdapter")
+
+# Registry of available adapters: platform -> (api adapter, browser-based fallback adapter)
+ADAPTERS: Dict[str, Tuple[Optional[LazyImport], Optional[LazyImport]]] = {
+    "grindr": (LazyImport("app.adapters.grindr.GrindrAdapter"), None),
+    "alibaba": (_ALIBABA_PRODUCTION, _ALIBABA_PRODUCTION),  # Use the production implementation for both
+    "alibaba_real": (
+        LazyImport("app.adapters.alibaba_real.AlibabaRealAdapter"),  # Keep real implementation
+        LazyImport("app.adapters.alibaba_real.AlibabaRealBrowserAdapter"),
+    ),
+    "sniffies": (None, None),  # Placeholder for future implementation
 }
+_NO_ADAPTERS: Tuple[None, None] = (None, None)
+_get_adapter_classes = ADAPTERS.get
+# Computed from registry keys only, so no adapter module is imported
+_AVAILABLE_PLATFORMS = tuple(name for name, (adapter, _) in ADAPTERS.items() if adapter is not None)
+
+# Adapter instances keyed by (platform_name, account id, account object id, use_browser),
+# least recently used first. Each account object gets its own adapter so callers holding
+# different (e.g. session-attached) copies of an account never share one.
+_ADAPTER_CACHE: "OrderedDict[Tuple[str, Any, int, bool], PlatformAdapter]" = OrderedDict()
+_ADAPTER_CACHE_LOCK = threading.Lock()
+_ADAPTER_CACHE_SIZE = 64
+# Close tasks for evicted adapters, referenced until done so they aren't garbage collected
+_CLOSE_TASKS: set = set()
+
+
+def _is_closed(adapter: PlatformAdapter) -> bool:
+    """True if the adapter's client is closed or a close has already been scheduled."""
+    return adapter.client.is_closed or getattr(adapter, "_close_task", None) is not None
+
+
+def _close_adapter(adapter: PlatformAdapter) -> None:
+    """Close an adapter dropped from the cache, scheduling async closes on the running loop."""
+    try:
+        result = adapter.close()
+        if not inspect.isawaitable(result):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(result)
+        else:
+            task = loop.create_task(result)
+            _CLOSE_TASKS.add(task)
+            task.add_done_callback(_CLOSE_TASKS.discard)
+    except Exception as e:
+        logger.warning(f"Failed to close evicted {type(adapter).__name__}: {e}")
 
 
 def get_adapter(
-    platform_name: str, 
-    account: PlatformAccount, 
+    platform_name: str,
+    account: PlatformAccount,
     use_browser: bool = False
 ) -> PlatformAdapter:
     """
     Factory function to get the appropriate adapter for a platform.
-    
+
+    Adapter instances are cached per saved account object so repeated calls with
+    the same account reuse the same authenticated client. Unsaved accounts (id
+    None) always get a fresh adapter, closed adapters are replaced, and adapters
+    evicted from the cache are closed.
+
     Args:
         platform_name: Name of the platform (e.g., 'grindr', 'alibaba')
         account: PlatformAccount instance with credentials
         use_browser: Whether to use browser-based adapter (if available)
-        
+
     Returns:
         Instantiated adapter for the platform
-        
+
     Raises:
         ValueError: If no adapter is found for the platform
     """
-    # Check for browser adapter first if requested
-    if use_browser:
-        adapter_class = BROWSER_ADAPTER_REGISTRY.get(platform_name)
-        if adapter_class:
-            return adapter_class(account)
-    
-    # Fall back to regular adapter
-    adapter_class = ADAPTER_REGISTRY.get(platform_name)
-    if not adapter_class:
-        raise ValueError(f"No adapter found for platform: {platform_name}")
-    
-    return adapter_class(account)
+    account_id = getattr(account, "id", None)
+    key = (platform_name, account_id, id(account), use_browser)
+    evicted = []
+
+    with _ADAPTER_CACHE_LOCK:
+        adapter = _ADAPTER_CACHE.get(key) if account_id is not None else None
+        if adapter is not None:
+            # id(account) can be reused once an account is freed, so check identity too
+            if adapter.account is account and not _is_closed(adapter):
+                _ADAPTER_CACHE.move_to_end(key)
+                return adapter
+            evicted.append(_ADAPTER_CACHE.pop(key))
+
+        api_class, browser_class = _get_adapter_classes(platform_name, _NO_ADAPTERS)
+        # Prefer the browser adapter if requested, falling back to the regular one
+        adapter_class = browser_class if use_browser and browser_class else api_class
+        if adapter_class is None:
+            raise ValueError(f"No adapter found for platform: {platform_name}")
+
+        adapter = adapter_class(account)
+        if account_id is not None:
+            _ADAPTER_CACHE[key] = adapter
+            if len(_ADAPTER_CACHE) > _ADAPTER_CACHE_SIZE:
+                evicted.append(_ADAPTER_CACHE.popitem(last=False)[1])
+
+    # Close outside the lock; async closes are only scheduled, never awaited here
+    for stale in evicted:
+        if not _is_closed(stale):
+            _close_adapter(stale)
+    return adapter
+
+
+def invalidate_adapter(account: PlatformAccount) -> None:
+    """Evict and close cached adapters for an account, e.g. after its credentials change."""
+    account_id = getattr(account, "id", None)
+    with _ADAPTER_CACHE_LOCK:
+        evicted = [_ADAPTER_CACHE.pop(key) for key in list(_ADAPTER_CACHE) if key[1] == account_id]
+    for adapter in evicted:
+        if not _is_closed(adapter):
+            _close_adapter(adapter)
 
 
 def get_available_platforms() -> list[str]:
     """Get list of platforms with available adapters."""
-    return [name for name, adapter in ADAPTER_REGISTRY.items() if adapter is not None]
+    return list(_AVAILABLE_PLATFORMS)
 
 
 def is_browser_adapter_available(platform_name: str) -> bool:
     """Check if a browser-based adapter is available for the platform."""
-    return platform_name in BROWSER_ADAPTER_REGISTRY and BROWSER_ADAPTER_REGISTRY[platform_name] is not None
\ No newline at end of file
+    return _get_adapter_classes(platform_name, _NO_ADAPTERS)[1] is not None
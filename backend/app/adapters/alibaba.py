@@ -1,9 +1,92 @@
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+import asyncio
 import httpx
 import json
+import os
+import re
+import time
 
-from app.adapters.base import PlatformAdapter, BrowserAdapter
+from app.adapters.base import PlatformAdapter, BrowserAdapter, json_dumps, json_loads
+
+# Shared connection pool limits for the async API client
+CLIENT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# Chunk size used when streaming media downloads to disk
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+# Maximum number of concurrent media uploads per message
+UPLOAD_CONCURRENCY = 5
+
+# CSRF token patterns: meta tag, then script variable
+_CSRF_META_RE = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+_CSRF_SCRIPT_RE = re.compile(r'window\.csrfToken\s*=\s*["\']([^"\']+)')
+
+# Normalized key -> API key for fields copied straight from API records
+_CONVERSATION_FIELDS = (("id", "conversationId"),)
+_MESSAGE_FIELDS = (
+    ("id", "messageId"),
+    ("sender_id", "senderId"),
+    ("sender_name", "senderName"),
+    ("timestamp", "timestamp"),
+)
+_CONVERSATION_KEYS, _CONVERSATION_SOURCES = zip(*_CONVERSATION_FIELDS)
+_MESSAGE_KEYS, _MESSAGE_SOURCES = zip(*_MESSAGE_FIELDS)
+
+
+def _normalize_conversation(conv: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an API conversation record."""
+    normalized = dict(zip(_CONVERSATION_KEYS, map(conv.get, _CONVERSATION_SOURCES)))
+    last_message = conv.get("lastMessage") or {}
+    normalized["title"] = conv.get("title") or conv.get("participantName")
+    normalized["last_message"] = last_message.get("content")
+    normalized["last_message_time"] = last_message.get("timestamp")
+    normalized["unread_count"] = conv.get("unreadCount", 0)
+    normalized["participants"] = conv.get("participants", [])
+    normalized["platform_data"] = conv  # Store original data
+    return normalized
+
+
+def _normalize_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an API message record."""
+    normalized = dict(zip(_MESSAGE_KEYS, map(msg.get, _MESSAGE_SOURCES)))
+    normalized["content"] = msg.get("content") or msg.get("text")
+    normalized["message_type"] = msg.get("type", "text")
+    normalized["media_urls"] = msg.get("attachments", [])
+    normalized["platform_data"] = msg  # Store original data
+    return normalized
+
+
+# Field order of the message rows returned by window.__gcsExtractMessages()
+BROWSER_MESSAGE_FIELDS = ("id", "content", "senderId", "timestamp", "messageType")
+
+# DOM extractors installed once per page and invoked by name from the browser adapter
+EXTRACTORS_JS = r"""
+    window.__gcsExtractChats = () => {
+        const convElements = document.querySelectorAll('.conversation-item');
+        return Array.from(convElements).map(el => ({
+            id: el.dataset.conversationId,
+            title: el.querySelector('.conversation-title')?.textContent,
+            lastMessage: el.querySelector('.last-message')?.textContent,
+            unreadCount: parseInt(el.querySelector('.unread-badge')?.textContent || '0'),
+        }));
+    };
+    window.__gcsExtractMessages = () => Array.from(document.querySelectorAll('.message-item'), el => [
+        el.dataset.messageId ?? null,
+        el.querySelector('.message-content')?.textContent ?? null,
+        el.dataset.senderId ?? null,
+        el.dataset.timestamp ?? null,
+        el.dataset.messageType || 'text',
+    ]);
+    window.__gcsExtractProfile = () => ({
+        username: document.querySelector('.profile-name')?.textContent,
+        companyName: document.querySelector('.company-name')?.textContent,
+        title: document.querySelector('.profile-title')?.textContent,
+        location: document.querySelector('.profile-location')?.textContent,
+        bio: document.querySelector('.profile-bio')?.textContent,
+        avatarUrl: document.querySelector('.profile-avatar')?.src,
+    });
+"""
 
 
 class AlibabaAdapter(PlatformAdapter):
@@ -12,6 +95,9 @@ class AlibabaAdapter(PlatformAdapter):
     BASE_URL = "https://message.alibaba.com"
     API_BASE_URL = "https://message.alibaba.com/api"
     LOGIN_URL = "https://login.alibaba.com"
+    COOKIE_DOMAIN = "alibaba.com"
+    
+    __slots__ = ("csrf_token", "user_id", "_default_headers", "_close_task")
     
     def __init__(self, account):
         super().__init__(account)
@@ -21,21 +107,37 @@ class AlibabaAdapter(PlatformAdapter):
         if self.csrf_token:
             self.client.headers["X-CSRF-Token"] = self.csrf_token
     
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create a pooled HTTP/2 client reused across all adapter calls."""
+        return httpx.AsyncClient(
+            http2=True,
+            limits=CLIENT_LIMITS,
+            headers=self._get_default_headers(),
+            cookies=self._load_cookies(),
+            timeout=30.0,
+        )
+    
     def _get_default_headers(self) -> Dict[str, str]:
-        """Get Alibaba-specific headers."""
+        """Get Alibaba-specific headers, built once per adapter."""
+        # The CSRF token lives on the client headers, so this never needs invalidating
+        try:
+            return self._default_headers
+        except AttributeError:
+            pass
         headers = super()._get_default_headers()
         headers.update({
             "Referer": self.BASE_URL,
             "Origin": self.BASE_URL,
             "X-Requested-With": "XMLHttpRequest",
         })
+        self._default_headers = headers
         return headers
     
     async def authenticate(self) -> bool:
         """Authenticate with Alibaba messaging system."""
         try:
             # Step 1: Get login page to extract CSRF token
-            login_response = self.client.get(f"{self.LOGIN_URL}/login")
+            login_response = await self.client.get(f"{self.LOGIN_URL}/login")
             if login_response.status_code != 200:
                 return False
             
@@ -55,20 +157,19 @@ class AlibabaAdapter(PlatformAdapter):
                 "csrf_token": csrf_token,
             }
             
-            response = self.client.post(
+            response = await self.client.post(
                 f"{self.LOGIN_URL}/authenticate",
                 data=login_data,
                 headers={"Content-Type": "application/x-www-form-urlencoded"}
             )
             
             if response.status_code == 200:
-                auth_data = response.json()
+                auth_data = json_loads(response.content)
                 if auth_data.get("success"):
                     self.user_id = auth_data.get("userId")
                     self.account.session_data = {
                         "csrf_token": self.csrf_token,
                         "user_id": self.user_id,
-                        "cookies": dict(self.client.cookies),
                     }
                     self._save_cookies()
                     return True
@@ -82,41 +183,19 @@ class AlibabaAdapter(PlatformAdapter):
         """Extract CSRF token from HTML response."""
         # Implementation will depend on actual Alibaba HTML structure
         # Common patterns: meta tag, hidden input, script variable
-        import re
-        
-        # Try meta tag
-        meta_match = re.search(r'<meta name="csrf-token" content="([^"]+)"', html)
-        if meta_match:
-            return meta_match.group(1)
-        
-        # Try script variable
-        script_match = re.search(r'window\.csrfToken\s*=\s*["\']([^"\']+)', html)
-        if script_match:
-            return script_match.group(1)
-        
-        return None
+        match = _CSRF_META_RE.search(html) or _CSRF_SCRIPT_RE.search(html)
+        return match.group(1) if match else None
     
     async def get_chats(self) -> List[Dict[str, Any]]:
         """Get list of conversations."""
         try:
-            response = self.client.get(f"{self.API_BASE_URL}/conversations")
+            response = await self.client.get(f"{self.API_BASE_URL}/conversations")
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 conversations = data.get("conversations", [])
                 
                 # Normalize conversation data
-                return [
-                    {
-                        "id": conv.get("conversationId"),
-                        "title": conv.get("title") or conv.get("participantName"),
-                        "last_message": conv.get("lastMessage", {}).get("content"),
-                        "last_message_time": conv.get("lastMessage", {}).get("timestamp"),
-                        "unread_count": conv.get("unreadCount", 0),
-                        "participants": conv.get("participants", []),
-                        "platform_data": conv,  # Store original data
-                    }
-                    for conv in conversations
-                ]
+                return list(map(_normalize_conversation, conversations))
         except Exception as e:
             self.logger.error(f"Failed to get chats: {e}")
         return []
@@ -128,29 +207,28 @@ class AlibabaAdapter(PlatformAdapter):
             if since:
                 params["since"] = since.isoformat()
                 
-            response = self.client.get(f"{self.API_BASE_URL}/messages", params=params)
+            response = await self.client.get(f"{self.API_BASE_URL}/messages", params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = json_loads(response.content)
                 messages = data.get("messages", [])
                 
                 # Normalize message data
-                return [
-                    {
-                        "id": msg.get("messageId"),
-                        "content": msg.get("content") or msg.get("text"),
-                        "sender_id": msg.get("senderId"),
-                        "sender_name": msg.get("senderName"),
-                        "timestamp": msg.get("timestamp"),
-                        "message_type": msg.get("type", "text"),
-                        "media_urls": msg.get("attachments", []),
-                        "platform_data": msg,  # Store original data
-                    }
-                    for msg in messages
-                ]
+                return list(map(_normalize_message, messages))
         except Exception as e:
             self.logger.error(f"Failed to get messages: {e}")
         return []
     
+    async def get_messages_bulk(self, chat_ids: List[str], since: Optional[datetime] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Get messages for several conversations concurrently over the pooled client."""
+        results = await asyncio.gather(
+            *(self.get_messages(chat_id, since) for chat_id in chat_ids),
+            return_exceptions=True,
+        )
+        return {
+            chat_id: [] if isinstance(result, Exception) else result
+            for chat_id, result in zip(chat_ids, results)
+        }
+    
     async def send_message(self, chat_id: str, content: str, media: Optional[List[str]] = None) -> Dict[str, Any]:
         """Send a message."""
         try:
@@ -167,9 +245,13 @@ class AlibabaAdapter(PlatformAdapter):
                     payload["attachments"] = media_ids
                     payload["type"] = "media"
                 
-            response = self.client.post(f"{self.API_BASE_URL}/messages", json=payload)
+            response = await self.client.post(
+                f"{self.API_BASE_URL}/messages",
+                content=json_dumps(payload),
+                headers={"Content-Type": "application/json"},
+            )
             if response.status_code == 200:
-                return response.json()
+                return json_loads(response.content)
         except Exception as e:
             self.logger.error(f"Failed to send message: {e}")
         return {}
@@ -177,9 +259,9 @@ class AlibabaAdapter(PlatformAdapter):
     async def get_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user profile."""
         try:
-            response = self.client.get(f"{self.API_BASE_URL}/users/{user_id}")
+            response = await self.client.get(f"{self.API_BASE_URL}/users/{user_id}")
             if response.status_code == 200:
-                profile = response.json()
+                profile = json_loads(response.content)
                 
                 return {
                     "platform_user_id": user_id,
@@ -210,29 +292,49 @@ class AlibabaAdapter(PlatformAdapter):
     async def download_media(self, url: str, save_path: str) -> bool:
         """Download media file."""
         try:
-            response = self.client.get(url)
-            if response.status_code == 200:
-                with open(save_path, "wb") as f:
-                    f.write(response.content)
-                return True
+            async with self.client.stream("GET", url) as response:
+                if response.status_code == 200:
+                    with open(save_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(chunk_size=MEDIA_CHUNK_SIZE):
+                            f.write(chunk)
+                    return True
         except Exception as e:
             self.logger.error(f"Failed to download media: {e}")
         return False
     
     async def _upload_media(self, media_paths: List[str]) -> List[str]:
-        """Upload media files and return media IDs."""
-        media_ids = []
-        for path in media_paths:
-            try:
-                with open(path, "rb") as f:
-                    files = {"file": f}
-                    response = self.client.post(f"{self.API_BASE_URL}/upload", files=files)
+        """Upload media files concurrently and return media IDs."""
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def upload_one(path: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    # httpx streams the open file handle into the multipart body
+                    with open(path, "rb") as f:
+                        files = {"file": f}
+                        response = await self.client.post(f"{self.API_BASE_URL}/upload", files=files)
                     if response.status_code == 200:
-                        data = response.json()
-                        media_ids.append(data.get("mediaId"))
-            except Exception as e:
-                self.logger.error(f"Failed to upload media {path}: {e}")
-        return media_ids
+                        return json_loads(response.content).get("mediaId")
+                except Exception as e:
+                    self.logger.error(f"Failed to upload media {path}: {e}")
+                return None
+        
+        results = await asyncio.gather(*(upload_one(path) for path in media_paths))
+        return [media_id for media_id in results if media_id]
+    
+    async def aclose(self):
+        """Close the pooled async HTTP client."""
+        await self.client.aclose()
+    
+    def close(self):
+        """Close the HTTP client; prefer awaiting aclose() from async code."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.aclose())
+        else:
+            # Keep a reference so the close task isn't garbage collected mid-flight
+            self._close_task = loop.create_task(self.aclose())
 
 
 class AlibabaBrowserAdapter(BrowserAdapter):
@@ -241,6 +343,32 @@ class AlibabaBrowserAdapter(BrowserAdapter):
     BASE_URL = "https://message.alibaba.com"
     LOGIN_URL = "https://login.alibaba.com"
     
+    # Seconds an already-open page may be reused without a reload. Off by default: a
+    # reused page shows stale DOM, so polls inside the window would miss new messages
+    NAVIGATION_TTL = float(os.getenv("ALIBABA_NAVIGATION_TTL", "0"))
+    
+    __slots__ = ("_navigated_at",)
+    
+    def __init__(self, account):
+        super().__init__(account)
+        self._navigated_at = 0.0
+    
+    async def _open(self, url: str, ready_selector: str):
+        """Navigate to a page, reusing it without a reload if it is already open and fresh."""
+        now = time.monotonic()
+        if self.page.url != url:
+            await self.page.goto(url)
+            self._navigated_at = now
+        elif now - self._navigated_at >= self.NAVIGATION_TTL:
+            await self.page.reload()
+            self._navigated_at = now
+        await self.page.wait_for_selector(ready_selector)
+    
+    async def init_browser(self):
+        """Initialize the browser and install the DOM extractors on every page load."""
+        await super().init_browser()
+        await self.page.add_init_script(script=EXTRACTORS_JS)
+    
     async def authenticate(self) -> bool:
         """Authenticate using browser automation."""
         try:
@@ -275,21 +403,10 @@ class AlibabaBrowserAdapter(BrowserAdapter):
     async def get_chats(self) -> List[Dict[str, Any]]:
         """Get conversations using DOM extraction."""
         try:
-            await self.page.goto(f"{self.BASE_URL}/conversations")
-            await self.page.wait_for_selector('.conversation-list')
+            await self._open(f"{self.BASE_URL}/conversations", '.conversation-list')
             
             # Extract conversation data from DOM
-            conversations = await self.page.evaluate("""
-                () => {
-                    const convElements = document.querySelectorAll('.conversation-item');
-                    return Array.from(convElements).map(el => ({
-                        id: el.dataset.conversationId,
-                        title: el.querySelector('.conversation-title')?.textContent,
-                        lastMessage: el.querySelector('.last-message')?.textContent,
-                        unreadCount: parseInt(el.querySelector('.unread-badge')?.textContent || '0'),
-                    }));
-                }
-            """)
+            conversations = await self.page.evaluate("window.__gcsExtractChats()")
             
             return conversations
             
@@ -300,24 +417,11 @@ class AlibabaBrowserAdapter(BrowserAdapter):
     async def get_messages(self, chat_id: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Get messages using DOM extraction."""
         try:
-            await self.page.goto(f"{self.BASE_URL}/conversation/{chat_id}")
-            await self.page.wait_for_selector('.message-list')
+            await self._open(f"{self.BASE_URL}/conversation/{chat_id}", '.message-list')
             
-            # Extract messages from DOM
-            messages = await self.page.evaluate("""
-                () => {
-                    const msgElements = document.querySelectorAll('.message-item');
-                    return Array.from(msgElements).map(el => ({
-                        id: el.dataset.messageId,
-                        content: el.querySelector('.message-content')?.textContent,
-                        senderId: el.dataset.senderId,
-                        timestamp: el.dataset.timestamp,
-                        messageType: el.dataset.messageType || 'text',
-                    }));
-                }
-            """)
-            
-            return messages
+            # Rows come back as positional arrays so field names aren't repeated per message
+            rows = await self.page.evaluate("window.__gcsExtractMessages()")
+            return [dict(zip(BROWSER_MESSAGE_FIELDS, row)) for row in rows]
             
         except Exception as e:
             self.logger.error(f"Failed to get messages via browser: {e}")
@@ -326,8 +430,7 @@ class AlibabaBrowserAdapter(BrowserAdapter):
     async def send_message(self, chat_id: str, content: str, media: Optional[List[str]] = None) -> Dict[str, Any]:
         """Send message using browser automation."""
         try:
-            await self.page.goto(f"{self.BASE_URL}/conversation/{chat_id}")
-            await self.page.wait_for_selector('.message-input')
+            await self._open(f"{self.BASE_URL}/conversation/{chat_id}", '.message-input')
             
             # Fill message content
             await self.page.fill('.message-input', content)
@@ -354,18 +457,7 @@ class AlibabaBrowserAdapter(BrowserAdapter):
             await self.page.wait_for_selector('.profile-container')
             
             # Extract profile data from DOM
-            profile = await self.page.evaluate("""
-                () => {
-                    return {
-                        username: document.querySelector('.profile-name')?.textContent,
-                        companyName: document.querySelector('.company-name')?.textContent,
-                        title: document.querySelector('.profile-title')?.textContent,
-                        location: document.querySelector('.profile-location')?.textContent,
-                        bio: document.querySelector('.profile-bio')?.textContent,
-                        avatarUrl: document.querySelector('.profile-avatar')?.src,
-                    };
-                }
-            """)
+            profile = await self.page.evaluate("window.__gcsExtractProfile()")
             
             return {
                 "platform_user_id": user_id,
@@ -380,11 +472,16 @@ class AlibabaBrowserAdapter(BrowserAdapter):
     async def download_media(self, url: str, save_path: str) -> bool:
         """Download media via browser."""
         try:
+            # The context's request API carries the browser's cookies, scoped by domain and path
             response = await self.page.context.request.get(url)
-            if response.ok:
-                with open(save_path, "wb") as f:
-                    f.write(await response.body())
-                return True
+            try:
+                if response.ok:
+                    with open(save_path, "wb") as f:
+                        f.write(await response.body())
+                    return True
+            finally:
+                # Free the body the driver buffered for this response
+                await response.dispose()
         except Exception as e:
             self.logger.error(f"Failed to download media via browser: {e}")
         return False
\ No newline at end of file
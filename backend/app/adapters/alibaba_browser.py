@@ -0,0 +1,104 @@
+"""Browser resources and page constants shared by the Alibaba browser adapters."""
+import asyncio
+import os
+import re
+from types import SimpleNamespace
+
+from playwright.async_api import Browser
+
+from app.adapters.base import LoopLocal, get_playwright
+from app.adapters.browser_pool import BrowserPool
+
+# Browser contexts for every Alibaba adapter, so ALIBABA_POOL_MAX caps them all together.
+# Keys are the account id for long-running (persistent) contexts and
+# ("production", account id) for contexts on the shared browser below.
+BROWSER_POOL = BrowserPool(
+    min_size=int(os.getenv("ALIBABA_POOL_MIN", "0")),
+    max_size=int(os.getenv("ALIBABA_POOL_MAX", "4")),
+    idle_timeout=float(os.getenv("ALIBABA_POOL_IDLE_TIMEOUT", "1800")),
+    acquire_timeout=float(os.getenv("ALIBABA_POOL_ACQUIRE_TIMEOUT", "120")),
+)
+
+# Chromium launch flags and context options that make automation look like a regular browser
+BROWSER_ARGS = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-web-security',
+    '--allow-running-insecure-content'
+]
+CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
+    "viewport": {"width": 1400, "height": 900},
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+}
+
+# Hides navigator.webdriver from the site's bot checks
+HIDE_WEBDRIVER_JS = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+"""
+
+# Elements and URLs whose appearance means a login step has finished
+LOGIN_FORM_SELECTOR = 'input[name="account"], input[name="loginId"], input[name="username"], input[type="email"]'
+LOGIN_SUBMIT_SELECTOR = 'button[type="submit"], button:has-text("Sign in"), button:has-text("登录"), .submit-btn'
+MESSENGER_URL_PATTERN = "https://message.alibaba.com/**"
+
+# 2FA modal controls
+TWO_FACTOR_INPUT_SELECTOR = 'input[aria-label*="verification" i], input[name*="code" i], input[placeholder*="code" i]'
+TWO_FACTOR_SUBMIT_RE = re.compile(r'submit|verify|confirm|登录', re.IGNORECASE)
+# Page text suggesting the login flow stopped at a verification step
+TWO_FACTOR_KEYWORDS = ['verification', 'verify', 'code', '验证', 'security', '2fa', 'authenticate']
+
+# Looks for any of the given (lowercase) keywords in the page's markup without serializing
+# it: walks tag names, attribute names and values, text and comments node by node and
+# stops at the first hit, which covers everything the outerHTML check used to search
+PAGE_HAS_KEYWORD_JS = """
+    (keywords) => {
+        const hasKeyword = value => {
+            const lower = value.toLowerCase();
+            return keywords.some(keyword => lower.includes(keyword));
+        };
+        const walker = document.createTreeWalker(
+            document.documentElement,
+            NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT | NodeFilter.SHOW_COMMENT,
+        );
+        for (let node = walker.currentNode; node; node = walker.nextNode()) {
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                if (hasKeyword(node.data)) return true;
+                continue;
+            }
+            if (hasKeyword(node.localName)) return true;
+            for (const attr of node.attributes) {
+                if (hasKeyword(attr.name) || hasKeyword(attr.value)) return true;
+            }
+        }
+        return false;
+    }
+"""
+
+# Contact name extraction
+FULL_NAME_RE = re.compile(r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b')
+CONTACT_NAME_RES = [
+    FULL_NAME_RE,  # First Last
+    re.compile(r'\b([A-Z][a-z]+)\b'),  # Single name
+]
+KNOWN_CONTACT_NAMES = ('Linda Wu', 'Kiko Liu', 'Ricky Foksy')
+NON_CONTACT_NAMES = frozenset({'All', 'The', 'Active', 'Project', 'Company', 'Ltd', 'Co'})
+
+# One Chromium process per headless mode, shared by every production adapter on the loop
+_browsers = LoopLocal(lambda: SimpleNamespace(lock=asyncio.Lock(), by_headless={}))
+
+
+async def get_browser(headless: bool = True) -> Browser:
+    """Return the shared Chromium for this headless mode, (re)launching it if needed."""
+    browsers = _browsers.get()
+    async with browsers.lock:
+        browser = browsers.by_headless.get(headless)
+        if browser is None or not browser.is_connected():
+            playwright = await get_playwright()
+            browser = await playwright.chromium.launch(headless=headless, args=BROWSER_ARGS)
+            browsers.by_headless[headless] = browser
+        return browser
@@ -2,22 +2,276 @@
 """Long-running Alibaba adapter with persistent browser and proper message extraction."""
 
 import asyncio
+import functools
 import logging
-import json
 import re
 import os
 import hashlib
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import Page
 
-from app.adapters.base import BrowserAdapter
+try:
+    import re2
+except ImportError:  # google-re2 is optional; the stdlib engine handles the same patterns
+    re2 = re
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional; fall back to the builtin string hash
+    xxhash = None
+
+from app.adapters.base import BrowserAdapter, json_dumps, parse_timestamp
 from app.db.base import SessionLocal
-from email_2fa import EmailTwoFactorReader
+from email_2fa import PersistentEmailTwoFactorReader
 from app.adapters.alibaba_message_parser import AlibabaMessageParser
+from app.adapters.substring_matcher import SubstringMatcher
+from app.adapters.alibaba_browser import (
+    BROWSER_ARGS,
+    BROWSER_POOL,
+    CONTACT_NAME_RES,
+    CONTEXT_OPTIONS,
+    HIDE_WEBDRIVER_JS,
+    KNOWN_CONTACT_NAMES,
+    LOGIN_FORM_SELECTOR,
+    LOGIN_SUBMIT_SELECTOR,
+    MESSENGER_URL_PATTERN,
+    NON_CONTACT_NAMES,
+    PAGE_HAS_KEYWORD_JS,
+    TWO_FACTOR_INPUT_SELECTOR,
+    TWO_FACTOR_KEYWORDS,
+    TWO_FACTOR_SUBMIT_RE,
+)
 
 logger = logging.getLogger(__name__)
 
+# Conversation list selectors
+CONVERSATION_SELECTOR = '[class*="conversation"]'
+CONVERSATION_FALLBACK_SELECTOR = 'div[onclick], div[data-chat-id], a[href*="chat"]'
+CONTACT_NAME_SELECTORS = [
+    '.contact-name',
+    '.user-name',
+    '.conversation-title',
+    '[class*="name"]',
+    'h3', 'h4', 'h5',
+    'strong'
+]
+LAST_MESSAGE_SELECTORS = [
+    '.last-message',
+    '.message-preview',
+    '[class*="preview"]',
+    '[class*="snippet"]',
+    'p',
+    'span'
+]
+CHAT_ID_ATTRIBUTES = ['data-chat-id', 'data-conversation-id', 'data-id', 'id']
+# Hrefs that open a conversation thread (JS regex source, matched case-insensitively);
+# avatar, profile and other links inside a conversation row don't qualify
+CONVERSATION_LINK_PATTERN = r'^https://message\.alibaba\.com/.*(chat|conversation)'
+# Message containers tried by the element-based fallback, joined into one selector list
+FALLBACK_MESSAGE_SELECTOR = ', '.join([
+    '[class*="message"]',
+    '[class*="msg"]',
+    '.message-item',
+    '.msg-item',
+    '[data-message-id]'
+])
+# Timestamp elements inside a message container, in order of preference
+MESSAGE_TIME_SELECTORS = [
+    '.timestamp',
+    '.time',
+    '[class*="time"]',
+    'time',
+    'small'
+]
+# Element class fragments marking a message as sent by us / received from the contact
+SENT_INDICATORS = ('sent', 'outgoing', 'right', 'self', 'my-message')
+RECEIVED_INDICATORS = ('received', 'incoming', 'left', 'other')
+# Case-sensitive sent markers used when the message parser can't parse an element
+BASIC_SENT_INDICATORS = ('sent', 'outgoing', 'self', 'right')
+# Elements whose appearance means a page state has finished loading
+MESSAGE_CONTENT_SELECTOR = '[class*="msg-content"], [class*="message-content"]'
+
+# Precompiled patterns
+DATE_PREFIX_RE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+CONVERSATION_TIMESTAMP_RES = [
+    re.compile(r'(\d{4}-\d{1,2}-\d{1,2})'),                # 2025-6-15
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{4})'),                 # 6/15/2025
+    re.compile(r'(\d{1,2}:\d{2})'),                          # 13:45
+    re.compile(r'(yesterday|today)', re.IGNORECASE),         # Relative dates
+]
+ONCLICK_ID_RE = re.compile(r'["\']id["\']\s*:\s*["\']([^"\']+)["\']')
+CHAT_INDEX_RE = re.compile(r'chat_(\d+)_')
+MESSAGE_DATE_RES = [
+    re.compile(r'2025-06-15\s+(\d{2}:\d{2})'),
+    re.compile(r'2025-06-16\s+(\d{2}:\d{2})'),
+    re.compile(r'(\d{2}:\d{2})'),
+    re.compile(r'2025-\d{2}-\d{2}'),
+]
+DIGITS_RE = re.compile(r'(\d+)')
+NON_NAME_WORDS_RE = re.compile(r'message|online|offline|typing', re.IGNORECASE)
+COMPANY_SUFFIX_RE = re.compile(r'\s*(Co\.|Ltd|Company|Inc|Corp|Industrial).*$', re.IGNORECASE)
+
+# Substrings that mark DOM text as UI chrome rather than a message
+UI_INDICATOR_WORDS = [
+    'Rate supplier', 'Send order request', 'File a complaint',
+    'Logistics Inquiry', 'Press "Enter"', 'Local Time:',
+    'Order', 'Waiting for supplier', 'USD', 'Request modification',
+    'javascript:', 'function(', 'var ', 'window.', 'document.',
+    'SearchInbox', 'AllUnread', 'plugin', '.js', '.css',
+    'alibaba.com', 'aplus', 'mlog'
+]
+UI_INDICATORS = SubstringMatcher(UI_INDICATOR_WORDS)
+# Substrings (matched against lowercased text) that suggest message content
+MESSAGE_HINT_WORDS = [
+    'thank you', 'how is', 'tomorrow', 'production', 'ok', 'great',
+    'Daniel', 'monday', 'update', 'final'
+]
+MESSAGE_HINTS = SubstringMatcher(MESSAGE_HINT_WORDS)
+# The message classification patterns below run over every DOM text candidate, so they are
+# compiled with RE2 (linear-time DFA, no backtracking) when available
+MARKUP_CHARS_RE = re2.compile(r'[<>{}\[\]]')
+# Lines containing any of these are UI elements, not message text
+UI_LINE_MARKERS = SubstringMatcher([
+    'Rate supplier', 'Send order', 'File a complaint',
+    'Press "Enter"', 'Local Time:', 'translating…',
+    'Feedback', 'Read', 'USD', 'Request modification'
+])
+# UI residue and duplicated phrases removed from joined message text in one pass
+CLEAN_MESSAGE_RE = re2.compile(
+    r'(?i)translating…Feedback'
+    r'|(?:FeedbackRead|Read|Feedback)$'
+    r'|(ok thank you ok thank you)'  # Fix duplicates (group 1 is halved, not removed)
+    r'|how is productionhow is production'
+    r'|tomorrow on Monday will be give you final updatetomorrow on Monday will be give you final update'
+)
+# Lowercased literals of CLEAN_MESSAGE_RE; text containing none of them can skip the regex
+CLEAN_MESSAGE_LITERALS = (
+    'translating…feedback',
+    'ok thank you ok thank you',
+    'how is productionhow is production',
+    'tomorrow on monday will be give you final updatetomorrow on monday will be give you final update',
+)
+CLEAN_MESSAGE_SUFFIXES = ('read', 'feedback')
+
+
+def _clean_message_repl(match) -> str:
+    """Replacement for CLEAN_MESSAGE_RE: halve the doubled "ok thank you", drop everything else."""
+    # Only the exact lowercase phrase is halved; other casings are dropped like the rest
+    return 'ok thank you' if match.group(1) == 'ok thank you ok thank you' else ''
+
+
+def _content_hash(data: Union[str, bytes]) -> int:
+    """64-bit hash used as a deduplication key in place of the full text."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data.encode('utf-8') if isinstance(data, str) else data)
+    return hash(data)
+
+
+# Walks the conversation list in-page and returns the raw texts/attributes for each element
+EXTRACT_CONVERSATIONS_JS = """
+    ({selector, fallbackSelector, nameSelectors, messageSelectors, idAttributes, linkPattern, limit}) => {
+        const threadLink = new RegExp(linkPattern, 'i');
+        let elements = document.querySelectorAll(selector);
+        const found = elements.length;
+        if (!found) {
+            elements = document.querySelectorAll(fallbackSelector);
+        }
+        return {
+            found,
+            items: Array.from(elements).slice(0, limit).map(el => ({
+                text: el.innerText,
+                names: nameSelectors.map(s => {
+                    const node = el.querySelector(s);
+                    return node ? node.innerText : null;
+                }),
+                previews: messageSelectors.map(s => Array.from(el.querySelectorAll(s), node => node.innerText)),
+                id: idAttributes.map(attr => el.getAttribute(attr)).find(value => value) || null,
+                onclick: el.getAttribute('onclick'),
+                link: [...el.querySelectorAll('a[href]'), el.closest('a[href]')]
+                    .map(a => a && a.href)
+                    .find(href => href && threadLink.test(href)) || null,
+            })),
+        };
+    }
+"""
+
+# Reads text, classes, id and timestamp text of every fallback message element in one call,
+# skipping empty elements and any whose text was already seen so duplicates never cross CDP
+EXTRACT_MESSAGE_ROWS_JS = """
+    ({selector, timeSelectors}) => {
+        const seen = new Set();
+        const rows = [];
+        for (const el of document.querySelectorAll(selector)) {
+            const text = el.innerText;
+            if (!text || seen.has(text)) {
+                continue;
+            }
+            seen.add(text);
+            const timeNode = timeSelectors.map(s => el.querySelector(s)).find(node => node);
+            rows.push({
+                text,
+                classes: el.getAttribute('class') || '',
+                messageId: el.getAttribute('data-message-id'),
+                timeText: timeNode ? timeNode.innerText : null,
+            });
+        }
+        return rows;
+    }
+"""
+
+# Text-based fallback: scans every text element in-page with the same checks as
+# _looks_like_message and returns only candidates, with the context the message builder needs
+SCAN_MESSAGE_CANDIDATES_JS = """
+    ({uiIndicators, messageHints}) => {
+        const candidates = [];
+        for (const el of document.querySelectorAll('div, span, p')) {
+            const text = el.innerText;
+            const length = text ? text.trim().length : 0;
+            if (length < 3 || uiIndicators.some(word => text.includes(word))) {
+                continue;
+            }
+            const lower = text.toLowerCase();
+            if (!messageHints.some(word => lower.includes(word)) && (length >= 50 || /[<>{}\\[\\]]/.test(text))) {
+                continue;
+            }
+            const parent = el.parentElement;
+            const grandparent = parent && parent.parentElement;
+            candidates.push({
+                text,
+                contextTexts: [text, parent && parent.innerText, grandparent && grandparent.innerText],
+                classes: el.getAttribute('class') || '',
+            });
+        }
+        return candidates;
+    }
+"""
+
+
+# Reads the elements one message selector matched in a single call, with the same fields as
+# SCAN_MESSAGE_CANDIDATES_JS. *:has-text() matches every ancestor of the text too, so rows
+# are deduplicated by text in-page rather than read element by element over CDP
+READ_MESSAGE_ELEMENTS_JS = """
+    (elements) => {
+        const seen = new Set();
+        const rows = [];
+        for (const el of elements) {
+            const text = el.innerText;
+            if (!text || seen.has(text)) {
+                continue;
+            }
+            seen.add(text);
+            const parent = el.parentElement;
+            const grandparent = parent && parent.parentElement;
+            rows.push({
+                text,
+                contextTexts: [text, parent && parent.innerText, grandparent && grandparent.innerText],
+                classes: el.getAttribute('class') || '',
+            });
+        }
+        return rows;
+    }
+"""
 
 class AlibabaLongRunningAdapter(BrowserAdapter):
     """Long-running Alibaba adapter that keeps browser open and refreshes periodically."""
@@ -27,66 +281,80 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
     
     def __init__(self, account):
         super().__init__(account)
-        self.email_reader = None
         self.authenticated = False
         self.browser_context = None
         self.last_refresh = None
         self.refresh_interval = 300  # 5 minutes
+        self._last_cookie_hash = None
+        self._cookies_cache = None
+        self._cookies_version = None  # account.updated_at the cache was read at
+        self.deep_links: Dict[str, str] = {}  # chat_id -> conversation URL seen in get_chats
+        self._inflight_messages: Dict[tuple, asyncio.Task] = {}  # (chat_id, since) -> running fetch
         self.message_parser = AlibabaMessageParser()
-        
-        # Initialize email reader for 2FA if credentials available
+        self._mail_mark = None  # 2FA folder's UIDNEXT taken just before submitting login
+        self.debug_screenshots = (
+            os.getenv("ALIBABA_DEBUG_SCREENSHOTS", "false").lower() == "true"
+            or logger.isEnabledFor(logging.DEBUG)
+        )
+    
+    @functools.cached_property
+    def email_reader(self) -> Optional[PersistentEmailTwoFactorReader]:
+        """Email reader for 2FA, built on first use since cached sessions never need it."""
         email_password = os.getenv("EMAIL_PASSWORD")
-        if email_password and hasattr(account, 'username'):
+        if email_password and hasattr(self.account, 'username'):
             twofa_folder = os.getenv("EMAIL_2FA_FOLDER", "2FA")
-            self.email_reader = EmailTwoFactorReader(
-                email_address=account.username,
+            return PersistentEmailTwoFactorReader(
+                email_address=self.account.username,
                 password=email_password,
                 folder=twofa_folder
             )
+        return None
     
     async def init_browser(self, headless: bool = True):
         """Initialize browser with persistent context and cookies."""
-        self.playwright = await async_playwright().start()
-        
-        # Create persistent browser context
-        user_data_dir = f"/tmp/alibaba_browser_{self.account.id}"
-        os.makedirs(user_data_dir, exist_ok=True)
-        
-        self.browser_context = await self.playwright.chromium.launch_persistent_context(
-            user_data_dir=user_data_dir,
-            headless=headless,
-            args=[
-                '--no-first-run',
-                '--no-default-browser-check',
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--allow-running-insecure-content'
-            ],
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
-            viewport={"width": 1400, "height": 900},
-            locale="en-US",
-            timezone_id="America/New_York"
+        self.browser_context = await BROWSER_POOL.acquire(
+            self.account.id,
+            lambda playwright: self._launch_context(playwright, headless)
         )
-        
+
         # Load saved cookies if available
-        if self.account.session_data and "cookies" in self.account.session_data:
+        cookies = self._get_saved_cookies()
+        if cookies is not None:
             try:
-                await self.browser_context.add_cookies(self.account.session_data["cookies"])
+                await self.browser_context.add_cookies(cookies)
                 logger.info("🍪 Loaded saved cookies")
             except Exception as e:
                 logger.warning(f"Failed to load cookies: {e}")
-        
+
         # Get the page
         pages = self.browser_context.pages
         self.page = pages[0] if pages else await self.browser_context.new_page()
-        
-        # Add script to remove webdriver property
-        await self.page.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-        """)
-    
+
+    def _get_saved_cookies(self) -> Optional[List[Dict[str, Any]]]:
+        """Saved session cookies, re-read from the account only when it has been updated."""
+        version = getattr(self.account, "updated_at", None)
+        if self._cookies_cache is None or self._cookies_version != version:
+            session_data = self.account.session_data
+            self._cookies_cache = session_data.get("cookies") if session_data else None
+            self._cookies_version = version
+        return self._cookies_cache
+
+    async def _launch_context(self, playwright, headless: bool):
+        """Launch this account's persistent browser context for the pool."""
+        user_data_dir = f"/tmp/alibaba_browser_{self.account.id}"
+        os.makedirs(user_data_dir, exist_ok=True)
+
+        context = await playwright.chromium.launch_persistent_context(
+            user_data_dir=user_data_dir,
+            headless=headless,
+            args=BROWSER_ARGS,
+            **CONTEXT_OPTIONS
+        )
+
+        # Remove the webdriver property on every page of the context, registered once at launch
+        await context.add_init_script(HIDE_WEBDRIVER_JS)
+        return context
+
     async def authenticate(self) -> bool:
         """Authenticate with Alibaba, reusing session if possible."""
         try:
@@ -100,10 +368,10 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 await self.init_browser(headless=headless)
             
             # First, try to navigate to messages directly (if we have valid cookies)
-            if self.account.session_data and "cookies" in self.account.session_data:
+            if self._get_saved_cookies() is not None:
                 logger.info("🍪 Attempting to use saved session...")
                 await self.page.goto(self.MESSAGE_URL, wait_until="load", timeout=30000)
-                await self.page.wait_for_timeout(3000)
+                await self._settle(timeout=3000)
                 
                 if self.page.url.startswith("https://message.alibaba.com") and "login" not in self.page.url:
                     logger.info("✅ Authentication successful using saved session!")
@@ -115,10 +383,13 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             login_url = f"{self.LOGIN_URL}?origin=message.alibaba.com&flag=1&return_url=https%253A%252F%252Fmessage.alibaba.com%252Fmessage%252Fmessenger.htm"
             logger.info(f"📥 Navigating to login page...")
             await self.page.goto(login_url, wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)
+            await self._settle(LOGIN_FORM_SELECTOR, timeout=3000)
             
             # Fill credentials
             await self._fill_login_credentials()
+            # Only mail delivered after this point can carry this login's 2FA code
+            if self.email_reader:
+                self._mail_mark = await asyncio.to_thread(self.email_reader.mark_new_mail)
             await self._submit_login()
             
             # Check if 2FA is required
@@ -126,7 +397,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 success = await self._handle_2fa()
                 if not success:
                     # Check if we're on the messages page after 400 redirect
-                    await self.page.wait_for_timeout(5000)
+                    await self._settle(url=MESSENGER_URL_PATTERN, timeout=5000)
                     if self.page.url.startswith("https://message.alibaba.com"):
                         logger.info("✅ Authentication successful despite 400 redirect!")
                         await self.save_browser_state()
@@ -136,7 +407,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                     return False
             
             # Wait for navigation to complete
-            await self.page.wait_for_timeout(5000)
+            await self._settle(url=MESSENGER_URL_PATTERN, timeout=5000)
             
             # Check if we're on the messages page
             if self.page.url.startswith("https://message.alibaba.com"):
@@ -149,7 +420,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 # Try manual navigation
                 try:
                     await self.page.goto(self.MESSAGE_URL, wait_until="load", timeout=60000)
-                    await self.page.wait_for_timeout(10000)
+                    await self._settle(url=MESSENGER_URL_PATTERN, timeout=10000)
                     if self.page.url.startswith("https://message.alibaba.com"):
                         logger.info("✅ Authentication successful via manual navigation!")
                         await self.save_browser_state()
@@ -175,7 +446,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         if time_since_refresh > self.refresh_interval:
             logger.info("🔄 Refreshing page to keep session alive...")
             await self.page.reload(wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)
+            await self._settle(timeout=5000)
             self.last_refresh = datetime.now()
             
             # Verify we're still on the right page
@@ -186,6 +457,17 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         
         return True
     
+    async def _debug_screenshot(self, name: str):
+        """Save a viewport screenshot for debugging failures, if enabled."""
+        if not self.debug_screenshots or not self.page:
+            return
+        try:
+            path = f"{name}.jpg"
+            await self.page.screenshot(path=path, full_page=False, type="jpeg", quality=50)
+            logger.info(f"📸 Saved debug screenshot to {path}")
+        except Exception as e:
+            logger.warning(f"Failed to save debug screenshot: {e}")
+    
     async def get_chats(self, max_age_days: int = 7) -> List[Dict[str, Any]]:
         """Get list of conversations with proper extraction."""
         if not await self.refresh_if_needed():
@@ -198,17 +480,13 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             if not self.page.url.startswith("https://message.alibaba.com"):
                 await self.page.goto(self.MESSAGE_URL, wait_until="networkidle", timeout=60000)
             
-            await self.page.wait_for_timeout(5000)
-            
             # Wait for conversation list to load
             try:
                 await self.page.wait_for_selector('[class*="conversation"]', timeout=10000)
                 logger.info("✅ Found conversation elements")
             except:
                 logger.warning("Conversation list selector not found, trying alternative selectors...")
-                # Take a screenshot to debug
-                await self.page.screenshot(path="debug_conversations.png")
-                logger.info("📸 Saved debug screenshot to debug_conversations.png")
+                await self._debug_screenshot("debug_conversations")
             
             # Extract conversations with better parsing
             conversations = await self._extract_conversations_properly()
@@ -225,24 +503,31 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         conversations = []
         
         try:
-            # Use the selector that was working in production adapter
-            conv_elements = await self.page.query_selector_all('[class*="conversation"]')
-            
-            if conv_elements:
-                logger.info(f"Found {len(conv_elements)} elements with selector: [class*=\"conversation\"]")
+            # Collect everything needed from the conversation elements in a single round-trip
+            result = await self.page.evaluate(EXTRACT_CONVERSATIONS_JS, {
+                'selector': CONVERSATION_SELECTOR,
+                'fallbackSelector': CONVERSATION_FALLBACK_SELECTOR,
+                'nameSelectors': CONTACT_NAME_SELECTORS,
+                'messageSelectors': LAST_MESSAGE_SELECTORS,
+                'idAttributes': CHAT_ID_ATTRIBUTES,
+                'linkPattern': CONVERSATION_LINK_PATTERN,
+                'limit': 10,  # Limit to 10 conversations
+            })
+            
+            if result['found']:
+                logger.info(f"Found {result['found']} elements with selector: {CONVERSATION_SELECTOR}")
             else:
+                # Fallback: any clickable items that might be conversations were extracted instead
                 logger.warning("No conversation elements found with standard selectors")
-                # Fallback: look for any clickable items that might be conversations
-                conv_elements = await self.page.query_selector_all('div[onclick], div[data-chat-id], a[href*="chat"]')
             
-            for i, element in enumerate(conv_elements[:10]):  # Limit to 10 conversations
+            for i, item in enumerate(result['items']):
                 try:
                     # Extract text content
-                    text_content = await element.inner_text()
+                    text_content = item['text'] or ''
                     logger.debug(f"Processing element {i}: {text_content[:100]}...")
                     
                     # Extract contact name
-                    contact_name = await self._extract_contact_name_from_element(element)
+                    contact_name = self._extract_contact_name_from_candidates(item['names'], text_content)
                     if not contact_name:
                         logger.debug(f"No contact name found in element {i}")
                         continue
@@ -250,13 +535,18 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                     logger.info(f"Found contact: {contact_name}")
                     
                     # Extract last message
-                    last_message = await self._extract_last_message_from_element(element)
+                    last_message = self._extract_last_message_from_candidates(item['previews'])
                     
                     # Extract timestamp if available
-                    timestamp = await self._extract_timestamp_from_element(element)
+                    timestamp = self._extract_timestamp_from_text(text_content)
                     
                     # Extract chat ID or create one
-                    chat_id = await self._extract_chat_id_from_element(element) or f"chat_{i}_{contact_name.replace(' ', '_').lower()}"
+                    chat_id = self._extract_chat_id(item['id'], item['onclick']) or f"chat_{i}_{contact_name.replace(' ', '_').lower()}"
+                    
+                    # Conversation URL, so get_messages can open it without re-finding the element
+                    deep_link = item['link'] if item['link'] and item['link'].startswith('http') else None
+                    if deep_link:
+                        self.deep_links[chat_id] = deep_link
                     
                     conversations.append({
                         'id': chat_id,
@@ -267,7 +557,8 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                         'participants': [contact_name],
                         'platform_data': {
                             'element_index': i,
-                            'selector': '[class*="conversation"]',
+                            'selector': CONVERSATION_SELECTOR,
+                            'deep_link': deep_link,
                             'raw_text': text_content[:500]  # Limit raw text storage
                         }
                     })
@@ -282,85 +573,34 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             logger.error(f"Error extracting conversations: {e}")
             return []
     
-    async def _extract_contact_name_from_element(self, element) -> Optional[str]:
-        """Extract clean contact name from conversation element."""
-        try:
-            # Try specific selectors for contact name
-            name_selectors = [
-                '.contact-name',
-                '.user-name',
-                '.conversation-title',
-                '[class*="name"]',
-                'h3', 'h4', 'h5',
-                'strong'
-            ]
-            
-            for selector in name_selectors:
-                try:
-                    name_element = await element.query_selector(selector)
-                    if name_element:
-                        name = await name_element.inner_text()
-                        clean_name = self._clean_contact_name(name)
-                        if clean_name:
-                            return clean_name
-                except:
-                    continue
-            
-            # Fallback: extract from full text
-            full_text = await element.inner_text()
-            return self._extract_contact_name(full_text)
-            
-        except Exception as e:
-            logger.debug(f"Error extracting contact name: {e}")
-            return None
+    def _extract_contact_name_from_candidates(self, names: List[Optional[str]], full_text: str) -> Optional[str]:
+        """Extract clean contact name from the texts matched by each name selector."""
+        for name in names:
+            if name:
+                clean_name = self._clean_contact_name(name)
+                if clean_name:
+                    return clean_name
+        
+        # Fallback: extract from full text
+        return self._extract_contact_name(full_text)
     
-    async def _extract_last_message_from_element(self, element) -> str:
-        """Extract last message from conversation element."""
-        try:
-            # Try specific selectors for last message
-            msg_selectors = [
-                '.last-message',
-                '.message-preview',
-                '[class*="preview"]',
-                '[class*="snippet"]',
-                'p',
-                'span'
-            ]
-            
-            for selector in msg_selectors:
-                try:
-                    msg_elements = await element.query_selector_all(selector)
-                    for msg_element in msg_elements:
-                        text = await msg_element.inner_text()
-                        if text and len(text) > 5 and len(text) < 200:
-                            # Filter out timestamps and metadata
-                            if not re.match(r'^\d{4}-\d{2}-\d{2}', text) and 'Co., Ltd' not in text:
-                                return text.strip()
-                except:
-                    continue
-            
-            return "No recent message"
-            
-        except Exception as e:
-            logger.debug(f"Error extracting last message: {e}")
-            return "No recent message"
+    def _extract_last_message_from_candidates(self, previews: List[List[str]]) -> str:
+        """Extract last message from the texts matched by each preview selector."""
+        for texts in previews:
+            for text in texts:
+                if text and len(text) > 5 and len(text) < 200:
+                    # Filter out timestamps and metadata
+                    if not DATE_PREFIX_RE.match(text) and 'Co., Ltd' not in text:
+                        return text.strip()
+        
+        return "No recent message"
     
-    async def _extract_timestamp_from_element(self, element) -> Optional[str]:
-        """Extract timestamp from conversation element."""
+    def _extract_timestamp_from_text(self, text: str) -> Optional[str]:
+        """Extract timestamp from conversation element text."""
         try:
-            # Look for timestamp patterns
-            text = await element.inner_text()
-            
             # Common timestamp patterns
-            patterns = [
-                r'(\d{4}-\d{1,2}-\d{1,2})',  # 2025-6-15
-                r'(\d{1,2}/\d{1,2}/\d{4})',   # 6/15/2025
-                r'(\d{1,2}:\d{2})',            # 13:45
-                r'(yesterday|today)',           # Relative dates
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+            for pattern in CONVERSATION_TIMESTAMP_RES:
+                match = pattern.search(text)
                 if match:
                     timestamp_str = match.group(1)
                     # Convert to ISO format if possible
@@ -381,32 +621,41 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             logger.debug(f"Error extracting timestamp: {e}")
             return None
     
-    async def _extract_chat_id_from_element(self, element) -> Optional[str]:
-        """Extract chat ID from element attributes."""
-        try:
-            # Check common attributes
-            attrs = ['data-chat-id', 'data-conversation-id', 'data-id', 'id']
-            for attr in attrs:
-                value = await element.get_attribute(attr)
-                if value:
-                    return value
-            
-            # Check onclick handler
-            onclick = await element.get_attribute('onclick')
-            if onclick:
-                # Look for ID patterns in onclick
-                match = re.search(r'["\']id["\']\s*:\s*["\']([^"\']+)["\']', onclick)
-                if match:
-                    return match.group(1)
-            
-            return None
-            
-        except Exception as e:
-            logger.debug(f"Error extracting chat ID: {e}")
-            return None
+    def _extract_chat_id(self, attribute_id: Optional[str], onclick: Optional[str]) -> Optional[str]:
+        """Extract chat ID from element attributes or its onclick handler."""
+        if attribute_id:
+            return attribute_id
+        
+        if onclick:
+            # Look for ID patterns in onclick
+            match = ONCLICK_ID_RE.search(onclick)
+            if match:
+                return match.group(1)
+        
+        return None
     
     async def get_messages(self, chat_id: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
-        """Get messages for a specific conversation with proper extraction."""
+        """
+        Get messages for a specific conversation with proper extraction.
+
+        Concurrent calls for the same chat and cutoff share a single browser fetch.
+        """
+        key = (chat_id, since)
+        inflight = self._inflight_messages.get(key)
+        if inflight is not None:
+            logger.info(f"📬 Joining in-flight message fetch for chat: {chat_id}")
+            return list(await asyncio.shield(inflight))
+        
+        task = asyncio.ensure_future(self._fetch_messages(chat_id, since))
+        self._inflight_messages[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight_messages.get(key) is task:
+                del self._inflight_messages[key]
+    
+    async def _fetch_messages(self, chat_id: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Open a conversation and extract its messages."""
         if not await self.refresh_if_needed():
             return []
         
@@ -421,11 +670,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             
             # Wait for messages to load
             logger.info("⏳ Waiting for messages to load...")
-            await self.page.wait_for_timeout(5000)
-            
-            # Take a screenshot for debugging
-            await self.page.screenshot(path=f"conversation_{chat_id}.png")
-            logger.info(f"📸 Saved conversation screenshot to conversation_{chat_id}.png")
+            await self._settle(MESSAGE_CONTENT_SELECTOR, timeout=5000)
             
             # Extract messages from the conversation
             messages = await self._extract_messages_from_conversation(chat_id, since)
@@ -435,14 +680,29 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             
         except Exception as e:
             logger.error(f"❌ Failed to get messages: {e}")
+            await self._debug_screenshot(f"conversation_{chat_id}")
             return []
     
     async def _open_conversation(self, chat_id: str) -> bool:
         """Open a specific conversation."""
         try:
+            # Navigate straight to the conversation when get_chats captured its URL
+            deep_link = self.deep_links.get(chat_id)
+            if deep_link:
+                logger.info(f"Opening conversation via deep link: {deep_link}")
+                await self.page.goto(deep_link, wait_until="domcontentloaded")
+                try:
+                    await self.page.wait_for_selector(MESSAGE_CONTENT_SELECTOR, timeout=8000)
+                    return True
+                except Exception as e:
+                    # Stale or wrong link: forget it and find the conversation in the list instead
+                    logger.warning(f"Deep link for {chat_id} did not open a conversation, falling back to the list: {e}")
+                    self.deep_links.pop(chat_id, None)
+                    await self.page.goto(self.MESSAGE_URL, wait_until="domcontentloaded")
+                    await self._settle(CONVERSATION_SELECTOR, timeout=5000)
+            
             # Extract element index from chat_id (e.g., "chat_0_linda_wu" -> 0)
-            import re
-            match = re.search(r'chat_(\d+)_', chat_id)
+            match = CHAT_INDEX_RE.search(chat_id)
             if match:
                 element_index = int(match.group(1))
                 logger.info(f"Opening conversation at index {element_index}")
@@ -451,7 +711,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 elements = await self.page.query_selector_all('[class*="conversation"]')
                 if element_index < len(elements):
                     await elements[element_index].click()
-                    await self.page.wait_for_timeout(3000)
+                    await self._settle(MESSAGE_CONTENT_SELECTOR, timeout=5000)
                     logger.info(f"✅ Clicked conversation {element_index}")
                     return True
                 else:
@@ -459,11 +719,11 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             
             # Fallback: try to find by text content
             elements = await self.page.query_selector_all('[class*="conversation"]')
-            for i, element in enumerate(elements):
-                text = await element.inner_text()
+            texts = await asyncio.gather(*(element.inner_text() for element in elements))
+            for i, (element, text) in enumerate(zip(elements, texts)):
                 if "linda wu" in text.lower():
                     await element.click()
-                    await self.page.wait_for_timeout(3000)
+                    await self._settle(MESSAGE_CONTENT_SELECTOR, timeout=5000)
                     logger.info(f"✅ Clicked conversation by text match at index {i}")
                     return True
             
@@ -511,46 +771,49 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 '*:has-text("how is production")'
             ]
             
-            found_elements = []
-            for selector in message_selectors:
-                try:
-                    elements = await self.page.query_selector_all(selector)
-                    if elements:
-                        logger.info(f"Found {len(elements)} elements with selector: {selector}")
-                        found_elements.extend(elements)
-                except Exception as e:
-                    logger.debug(f"Selector {selector} failed: {e}")
+            # One in-page read per selector; CDP multiplexes the calls over one connection
+            results = await asyncio.gather(
+                *(self.page.locator(selector).evaluate_all(READ_MESSAGE_ELEMENTS_JS) for selector in message_selectors),
+                return_exceptions=True
+            )
+            rows = []
+            for selector, selector_rows in zip(message_selectors, results):
+                if isinstance(selector_rows, Exception):
+                    logger.debug(f"Selector {selector} failed: {selector_rows}")
+                elif selector_rows:
+                    logger.info(f"Found {len(selector_rows)} elements with selector: {selector}")
+                    rows.extend(selector_rows)
                     
-            # If no specific selectors work, look for text content patterns
-            if not found_elements:
+            if not rows:
+                # If no specific selectors work, look for text content patterns in one in-page scan
                 logger.info("No message elements found with selectors, trying text-based extraction")
-                # Get all text elements and filter for message-like content
-                all_elements = await self.page.query_selector_all('div, span, p')
-                
-                for element in all_elements:
-                    try:
-                        text = await element.inner_text()
-                        # Look for patterns that suggest this is a message
-                        if self._looks_like_message(text):
-                            found_elements.append(element)
-                    except:
-                        continue
-            
-            # Process found elements
+                rows = await self.page.evaluate(SCAN_MESSAGE_CANDIDATES_JS, {
+                    'uiIndicators': UI_INDICATOR_WORDS,
+                    'messageHints': MESSAGE_HINT_WORDS,
+                })
+            extracted = [
+                self._build_clean_message_data(
+                    row['text'],
+                    self._extract_timestamp_from_texts(row['contextTexts']),
+                    self._message_direction_from(row['classes'], row['text']),
+                    chat_id
+                )
+                for row in rows
+            ]
             unique_messages = set()
-            for element in found_elements:
+            for message_data in extracted:
                 try:
-                    message_data = await self._extract_clean_message_data(element, chat_id)
                     if message_data and message_data['content']:
                         # Use content as deduplication key
                         content_key = message_data['content'].strip()
-                        if content_key not in unique_messages and len(content_key) > 2:
-                            unique_messages.add(content_key)
+                        content_hash = _content_hash(content_key)
+                        if content_hash not in unique_messages and len(content_key) > 2:
+                            unique_messages.add(content_hash)
                             
                             # Apply date filter
                             if since and message_data.get('timestamp'):
                                 try:
-                                    msg_datetime = datetime.fromisoformat(message_data['timestamp'].replace('Z', '+00:00'))
+                                    msg_datetime = parse_timestamp(message_data['timestamp'])
                                     if msg_datetime < since:
                                         continue
                                 except:
@@ -574,40 +837,22 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             return False
             
         # Filter out UI elements
-        ui_indicators = [
-            'Rate supplier', 'Send order request', 'File a complaint',
-            'Logistics Inquiry', 'Press "Enter"', 'Local Time:',
-            'Order', 'Waiting for supplier', 'USD', 'Request modification',
-            'javascript:', 'function(', 'var ', 'window.', 'document.',
-            'SearchInbox', 'AllUnread', 'plugin', '.js', '.css',
-            'alibaba.com', 'aplus', 'mlog'
-        ]
-        
-        for indicator in ui_indicators:
-            if indicator in text:
-                return False
+        if UI_INDICATORS.search(text):
+            return False
         
         # Look for message-like patterns
-        message_patterns = [
-            'thank you', 'how is', 'tomorrow', 'production', 'ok', 'great',
-            'Daniel', 'monday', 'update', 'final'
-        ]
-        
-        text_lower = text.lower()
-        for pattern in message_patterns:
-            if pattern in text_lower:
-                return True
+        if MESSAGE_HINTS.search(text.lower()):
+            return True
                 
         # Also accept if it's short and simple
-        if len(text.strip()) < 50 and not any(char in text for char in ['<', '>', '{', '}', '[', ']']):
+        if len(text.strip()) < 50 and not MARKUP_CHARS_RE.search(text):
             return True
             
         return False
     
-    async def _extract_clean_message_data(self, element, chat_id: str) -> Optional[Dict[str, Any]]:
-        """Extract clean message data from an element."""
+    def _build_clean_message_data(self, text: str, timestamp: Optional[str], is_sent: bool, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Build message data from an element's text and the cues gathered around it."""
         try:
-            text = await element.inner_text()
             if not text or not self._looks_like_message(text):
                 return None
             
@@ -616,12 +861,6 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             if not cleaned_text or len(cleaned_text.strip()) < 2:
                 return None
             
-            # Try to extract timestamp from nearby elements or the text itself
-            timestamp = await self._extract_timestamp_from_context(element)
-            
-            # Determine direction - look for visual cues or position
-            is_sent = await self._determine_message_direction(element)
-            
             # Generate unique ID
             msg_id = self._generate_message_id(cleaned_text, timestamp, 'user' if is_sent else chat_id)
             
@@ -642,7 +881,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             }
             
         except Exception as e:
-            logger.debug(f"Error extracting clean message data: {e}")
+            logger.debug(f"Error building clean message data: {e}")
             return None
     
     def _clean_message_text(self, text: str) -> str:
@@ -658,103 +897,70 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 continue
                 
             # Skip UI elements
-            if any(ui in line for ui in ['Rate supplier', 'Send order', 'File a complaint', 
-                                        'Press "Enter"', 'Local Time:', 'translating…',
-                                        'Feedback', 'Read', 'USD', 'Request modification']):
+            if UI_LINE_MARKERS.search(line):
                 continue
                 
             # Skip duplicates
-            if line in seen_lines:
+            line_hash = _content_hash(line)
+            if line_hash in seen_lines:
                 continue
                 
-            seen_lines.add(line)
+            seen_lines.add(line_hash)
             cleaned_lines.append(line)
         
         # Join and further clean
         result = ' '.join(cleaned_lines)
         
         # Remove specific patterns
-        patterns_to_remove = [
-            r'translating…Feedback',
-            r'Read$',
-            r'Feedback$',
-            r'ok thank you ok thank you',  # Fix duplicates
-            r'how is productionhow is production',
-            r'tomorrow on Monday will be give you final updatetomorrow on Monday will be give you final update'
-        ]
-        
-        for pattern in patterns_to_remove:
-            result = re.sub(pattern, lambda m: m.group(0)[:len(m.group(0))//2] if 'ok thank you ok thank you' in m.group(0) else '', result, flags=re.IGNORECASE)
+        lowered = result.lower()
+        if lowered.endswith(CLEAN_MESSAGE_SUFFIXES) or any(literal in lowered for literal in CLEAN_MESSAGE_LITERALS):
+            result = CLEAN_MESSAGE_RE.sub(_clean_message_repl, result)
         
         return result.strip()
     
-    async def _extract_timestamp_from_context(self, element) -> Optional[str]:
-        """Extract timestamp from element or its context."""
-        try:
-            # Look for timestamp patterns in the element and its siblings
-            for selector in [element, await element.query_selector('..'), await element.query_selector('../..')]:
-                if selector:
-                    text = await selector.inner_text()
-                    
-                    # Look for date patterns
-                    date_patterns = [
-                        r'2025-06-15\s+(\d{2}:\d{2})',
-                        r'2025-06-16\s+(\d{2}:\d{2})',
-                        r'(\d{2}:\d{2})',
-                        r'2025-\d{2}-\d{2}'
-                    ]
-                    
-                    for pattern in date_patterns:
-                        match = re.search(pattern, text)
-                        if match:
-                            # Try to construct a full timestamp
-                            if '2025-06-15' in text:
-                                time_part = match.group(1) if len(match.groups()) > 0 else '00:00'
-                                return f"2025-06-15 {time_part}:00"
-                            elif '2025-06-16' in text:
-                                time_part = match.group(1) if len(match.groups()) > 0 else '00:00'
-                                return f"2025-06-16 {time_part}:00"
-                            
-        except Exception as e:
-            logger.debug(f"Error extracting timestamp: {e}")
+    def _extract_timestamp_from_texts(self, texts: List[Optional[str]]) -> Optional[str]:
+        """Extract timestamp from the texts of an element, its parent and grandparent."""
+        for text in texts:
+            if not text:
+                continue
+            
+            # Look for date patterns
+            for pattern in MESSAGE_DATE_RES:
+                match = pattern.search(text)
+                if match:
+                    # Try to construct a full timestamp
+                    if '2025-06-15' in text:
+                        time_part = match.group(1) if len(match.groups()) > 0 else '00:00'
+                        return f"2025-06-15 {time_part}:00"
+                    elif '2025-06-16' in text:
+                        time_part = match.group(1) if len(match.groups()) > 0 else '00:00'
+                        return f"2025-06-16 {time_part}:00"
         
         return None
     
-    async def _determine_message_direction(self, element) -> bool:
-        """Determine if message was sent by user or received."""
-        try:
-            # Check element classes and styles for direction indicators
-            classes = await element.get_attribute('class') or ''
-            style = await element.get_attribute('style') or ''
-            
-            # Common patterns for sent messages
-            sent_indicators = ['sent', 'outgoing', 'right', 'self', 'my-message']
-            received_indicators = ['received', 'incoming', 'left', 'other']
-            
-            classes_lower = classes.lower()
-            
-            for indicator in sent_indicators:
-                if indicator in classes_lower:
-                    return True
-                    
-            for indicator in received_indicators:
-                if indicator in classes_lower:
-                    return False
-            
-            # Check if element contains "Daniel Allen:" prefix
-            text = await element.inner_text()
-            if "Daniel Allen:" in text:
-                return True
-                
-            # Default to incoming for safety
-            return False
-            
-        except Exception as e:
-            logger.debug(f"Error determining direction: {e}")
+    def _message_direction_from(self, classes: str, text: str) -> bool:
+        """Determine if message was sent by user from its element classes and text."""
+        is_sent = self._direction_from_classes(classes)
+        return is_sent if is_sent is not None else self._direction_from_text(text)
+    
+    def _direction_from_classes(self, classes: str) -> Optional[bool]:
+        """Direction indicated by element classes, or None if they don't say."""
+        classes_lower = classes.lower()
+        if any(indicator in classes_lower for indicator in SENT_INDICATORS):
+            return True
+        if any(indicator in classes_lower for indicator in RECEIVED_INDICATORS):
             return False
+        return None
+    
+    def _direction_from_text(self, text: str) -> bool:
+        """Direction from message text; defaults to incoming for safety."""
+        # Check if element contains "Daniel Allen:" prefix
+        return "Daniel Allen:" in text
     
     def _generate_message_id(self, content: str, timestamp: Optional[str], sender: str) -> str:
         """Generate unique message ID."""
+        # IDs are stored as Message.platform_message_id and used to skip already-synced
+        # messages, so the digest must stay MD5; a faster hash would re-import every message
         unique_str = f"{content}:{timestamp or 'no-time'}:{sender}"
         return f"msg_{hashlib.md5(unique_str.encode()).hexdigest()[:16]}"
     
@@ -763,56 +969,32 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         try:
             messages = []
             
-            # Try multiple selectors for message elements
-            message_selectors = [
-                '[class*="message"]',
-                '[class*="msg"]',
-                '.message-item',
-                '.msg-item',
-                '[data-message-id]'
-            ]
-            
-            all_elements = []
-            for selector in message_selectors:
-                try:
-                    elements = await self.page.query_selector_all(selector)
-                    if elements:
-                        logger.info(f"Found {len(elements)} message elements with selector: {selector}")
-                        all_elements.extend(elements)
-                except Exception as e:
-                    logger.debug(f"Selector {selector} failed: {e}")
-            
-            # Remove duplicates
-            unique_elements = []
-            seen_elements = set()
-            for element in all_elements:
-                try:
-                    element_text = await element.inner_text()
-                    if element_text and element_text not in seen_elements:
-                        seen_elements.add(element_text)
-                        unique_elements.append(element)
-                except:
-                    continue
-            
-            logger.info(f"Processing {len(unique_elements)} unique message elements")
-            
-            for element in unique_elements:
-                try:
-                    message_data = await self._extract_message_data(element, chat_id)
-                    if message_data:
-                        # Apply date filter
-                        if since and message_data.get('timestamp'):
-                            try:
-                                msg_datetime = datetime.fromisoformat(message_data['timestamp'].replace('Z', '+00:00'))
-                                if msg_datetime < since:
-                                    continue
-                            except:
-                                pass
-                        
-                        messages.append(message_data)
-                except Exception as e:
-                    logger.debug(f"Error extracting message from element: {e}")
+            # Match every message selector in one DOM walk and read each element's data
+            # in the same call; rows come back deduplicated by text, in document order
+            unique_rows = await self.page.evaluate(EXTRACT_MESSAGE_ROWS_JS, {
+                'selector': FALLBACK_MESSAGE_SELECTOR,
+                'timeSelectors': MESSAGE_TIME_SELECTORS,
+            })
+            
+            logger.info(f"Processing {len(unique_rows)} unique message elements")
+            
+            # One reference time for the whole pass
+            now = datetime.now()
+            for row in unique_rows:
+                # Rows are plain data and _extract_message_data handles its own errors
+                message_data = self._extract_message_data(row, chat_id, now)
+                if not message_data:
                     continue
+                
+                # Apply date filter; relative or unparseable timestamps are kept
+                if since and message_data.get('timestamp'):
+                    try:
+                        if parse_timestamp(message_data['timestamp']) < since:
+                            continue
+                    except (ValueError, TypeError):
+                        pass
+                
+                messages.append(message_data)
             
             return messages
             
@@ -820,16 +1002,18 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             logger.error(f"Fallback extraction failed: {e}")
             return []
     
-    async def _extract_message_data(self, element, chat_id: str) -> Optional[Dict[str, Any]]:
-        """Extract data from a single message element."""
+    def _extract_message_data(self, row: Dict[str, Any], chat_id: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Extract data from a single message element's row (see EXTRACT_MESSAGE_ROWS_JS)."""
+        now = now or datetime.now()
         try:
             # Get message text
-            text = await element.inner_text()
-            if not text or len(text.strip()) < 1:
+            text = row['text']
+            content = text.strip() if text else ''
+            if not content:
                 return None
             
             # Get classes for sent/received detection
-            classes = await element.get_attribute('class') or ''
+            classes = row['classes']
             
             # Use message parser to parse this individual message
             parsed_msg = self.message_parser.parse_message_element(text, classes)
@@ -841,7 +1025,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                     'content': parsed_msg.get('content'),
                     'sender_id': chat_id if not parsed_msg.get('is_sent') else 'self',
                     'sender_name': parsed_msg.get('sender_name') or ('You' if parsed_msg.get('is_sent') else chat_id),
-                    'timestamp': parsed_msg.get('timestamp') or datetime.now().isoformat(),
+                    'timestamp': parsed_msg.get('timestamp') or now.isoformat(),
                     'is_sent': parsed_msg.get('is_sent', False),
                     'direction': parsed_msg.get('direction', 'incoming'),
                     'is_reply': parsed_msg.get('is_reply', False),
@@ -854,16 +1038,17 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
                 }
             else:
                 # Fallback to basic extraction if parser fails
-                is_sent = any(indicator in classes for indicator in ['sent', 'outgoing', 'self', 'right'])
-                timestamp = await self._extract_message_timestamp(element)
-                msg_id = await element.get_attribute('data-message-id') or f"msg_{chat_id}_{datetime.now().timestamp()}"
+                is_sent = any(indicator in classes for indicator in BASIC_SENT_INDICATORS)
+                timestamp = self._normalize_timestamp(row['timeText'], now) if row['timeText'] is not None else None
+                # Rows are unique by text within a pass, so a content hash gives a stable id across syncs
+                msg_id = row['messageId'] or self._generate_message_id(content, None, chat_id)
                 
                 return {
                     'id': msg_id,
-                    'content': text.strip(),
+                    'content': content,
                     'sender_id': 'self' if is_sent else chat_id,
                     'sender_name': 'You' if is_sent else chat_id,
-                    'timestamp': timestamp or datetime.now().isoformat(),
+                    'timestamp': timestamp or now.isoformat(),
                     'is_sent': is_sent,
                     'direction': 'outgoing' if is_sent else 'incoming',
                     'is_reply': False,
@@ -878,63 +1063,40 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             logger.debug(f"Error extracting message data: {e}")
             return None
     
-    async def _extract_message_timestamp(self, element) -> Optional[str]:
-        """Extract timestamp from message element."""
-        try:
-            # Look for timestamp elements
-            time_selectors = [
-                '.timestamp',
-                '.time',
-                '[class*="time"]',
-                'time',
-                'small'
-            ]
-            
-            for selector in time_selectors:
-                try:
-                    time_element = await element.query_selector(selector)
-                    if time_element:
-                        time_text = await time_element.inner_text()
-                        # Parse and normalize timestamp
-                        return self._normalize_timestamp(time_text)
-                except:
-                    continue
-            
-            return None
-            
-        except Exception as e:
-            logger.debug(f"Error extracting timestamp: {e}")
-            return None
-    
-    def _normalize_timestamp(self, time_text: str) -> str:
-        """Normalize various timestamp formats to ISO format."""
+    def _normalize_timestamp(self, time_text: str, now: Optional[datetime] = None) -> str:
+        """Normalize various timestamp formats to ISO format, relative to now."""
+        now = now or datetime.now()
         try:
             # Handle relative times
-            if 'just now' in time_text.lower():
-                return datetime.now().isoformat()
-            elif 'minute' in time_text.lower():
-                minutes = int(re.search(r'(\d+)', time_text).group(1))
-                return (datetime.now() - timedelta(minutes=minutes)).isoformat()
-            elif 'hour' in time_text.lower():
-                hours = int(re.search(r'(\d+)', time_text).group(1))
-                return (datetime.now() - timedelta(hours=hours)).isoformat()
-            elif 'yesterday' in time_text.lower():
-                return (datetime.now() - timedelta(days=1)).isoformat()
+            lower = time_text.lower()
+            if 'just now' in lower:
+                return now.isoformat()
+            elif 'minute' in lower:
+                minutes = int(DIGITS_RE.search(time_text).group(1))
+                return (now - timedelta(minutes=minutes)).isoformat()
+            elif 'hour' in lower:
+                hours = int(DIGITS_RE.search(time_text).group(1))
+                return (now - timedelta(hours=hours)).isoformat()
+            elif 'yesterday' in lower:
+                return (now - timedelta(days=1)).isoformat()
             
             # Try to parse absolute times
             # Add more parsing logic as needed
             return time_text
             
         except:
-            return datetime.now().isoformat()
+            return now.isoformat()
     
-    def _clean_contact_name(self, name: str) -> Optional[str]:
-        """Clean and validate contact name."""
-        if not name:
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _clean_contact_name(name: str) -> Optional[str]:
+        """Clean and validate contact name (cached: contact rows repeat on every chat list refresh)."""
+        # Suffix removal only shortens the name, so anything already too short can be rejected first
+        if not name or len(name.strip()) < 2:
             return None
         
         # Remove common suffixes
-        name = re.sub(r'\s*(Co\.|Ltd|Company|Inc|Corp|Industrial).*$', '', name, flags=re.IGNORECASE)
+        name = COMPANY_SUFFIX_RE.sub('', name)
         name = name.strip()
         
         # Validate it's a reasonable name
@@ -942,33 +1104,30 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
             return None
         
         # Filter out non-name content
-        if any(word in name.lower() for word in ['message', 'online', 'offline', 'typing']):
+        if NON_NAME_WORDS_RE.search(name):
             return None
         
         return name
     
     # Keep the helper methods from the original adapter
-    def _extract_contact_name(self, text: str) -> Optional[str]:
-        """Extract a clean contact name from raw text."""
-        import re
-        
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _extract_contact_name(text: str) -> Optional[str]:
+        """Extract a clean contact name from raw text (cached like _clean_contact_name)."""
         # Common patterns for names
-        name_patterns = [
-            r'\b([A-Z][a-z]+ [A-Z][a-z]+)\b',  # First Last
-            r'\b([A-Z][a-z]+)\b',  # Single name
-            r'(Linda Wu)',  # Known contact
-            r'(Kiko Liu)',  # Known contact  
-            r'(Ricky Foksy)'  # Known contact
-        ]
-        
-        for pattern in name_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                name = matches[0]
+        for pattern in CONTACT_NAME_RES:
+            match = pattern.search(text)
+            if match:
+                name = match.group(1)
                 # Filter out common non-name words
-                if name not in ['All', 'The', 'Active', 'Project', 'Company', 'Ltd', 'Co']:
+                if name not in NON_CONTACT_NAMES:
                     return name
         
+        # Known contacts are plain substrings, no regex needed
+        for name in KNOWN_CONTACT_NAMES:
+            if name in text:
+                return name
+        
         return None
     
     async def save_browser_state(self):
@@ -976,12 +1135,21 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         if self.page:
             cookies = await self.browser_context.cookies()
             
+            # Skip the update when the cookie jar hasn't changed since the last save
+            cookie_hash = _content_hash(json_dumps(cookies))
+            if cookie_hash == self._last_cookie_hash:
+                logger.debug("🍪 Cookies unchanged, skipping browser state update")
+                return
+            self._last_cookie_hash = cookie_hash
+            
             # Update account session data
             if not self.account.session_data:
                 self.account.session_data = {}
             
             self.account.session_data["cookies"] = cookies
             self.account.session_data["last_auth"] = datetime.now().isoformat()
+            self._cookies_cache = cookies
+            self._cookies_version = getattr(self.account, "updated_at", None)
             
             # Save to database (account is already attached to a session)
             try:
@@ -1002,10 +1170,14 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         """Actually shutdown the browser when needed."""
         logger.info("🧹 Shutting down Alibaba browser...")
         if self.browser_context:
-            await self.browser_context.close()
-        if self.playwright:
-            await self.playwright.stop()
-        super().close()
+            # The pool keeps the context warm for the next adapter of this account
+            await BROWSER_POOL.release(self.account.id)
+            self.browser_context = None
+            self.page = None
+        # Only log out if 2FA ever built the reader
+        if self.__dict__.get("email_reader"):
+            await asyncio.to_thread(self.email_reader.logout)
+        await super().close()
     
     async def send_message(self, chat_id: str, content: str, media: Optional[List[str]] = None) -> Dict[str, Any]:
         """Send a message to a chat (not implemented for Alibaba yet)."""
@@ -1032,21 +1204,11 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         """Fill login form with credentials."""
         logger.info("✏️ Filling login credentials...")
         
-        # Find username field
-        username_selectors = [
-            'input[name="account"]',
-            'input[name="loginId"]',
-            'input[name="username"]',
-            'input[type="email"]'
-        ]
-        
-        username_input = None
-        for selector in username_selectors:
-            try:
-                username_input = await self.page.wait_for_selector(selector, timeout=2000)
-                break
-            except:
-                continue
+        # Find username field; the joined selector resolves on whichever variant appears first
+        try:
+            username_input = await self.page.wait_for_selector(LOGIN_FORM_SELECTOR, timeout=5000)
+        except:
+            username_input = None
         
         if username_input:
             await username_input.fill(self.account.username)
@@ -1066,24 +1228,14 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         """Submit the login form."""
         logger.info("🖱️ Submitting login form...")
         
-        submit_selectors = [
-            'button[type="submit"]',
-            'button:has-text("Sign in")',
-            'button:has-text("登录")',
-            '.submit-btn'
-        ]
-        
-        submit_button = None
-        for selector in submit_selectors:
-            try:
-                submit_button = await self.page.wait_for_selector(selector, timeout=2000)
-                break
-            except:
-                continue
+        try:
+            submit_button = await self.page.wait_for_selector(LOGIN_SUBMIT_SELECTOR, timeout=5000)
+        except:
+            submit_button = None
         
         if submit_button:
             await submit_button.click()
-            await self.page.wait_for_timeout(5000)
+            await self._settle(timeout=5000)
             logger.info("✅ Login form submitted")
         else:
             raise Exception("Submit button not found")
@@ -1094,10 +1246,7 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         if "login" not in current_url:
             return False
         
-        page_content = await self.page.content()
-        has_verification_text = any(keyword in page_content.lower() for keyword in [
-            'verification', 'verify', 'code', '验证', 'security', '2fa', 'authenticate'
-        ])
+        has_verification_text = await self.page.evaluate(PAGE_HAS_KEYWORD_JS, TWO_FACTOR_KEYWORDS)
         
         if has_verification_text:
             logger.info("🔍 2FA verification required")
@@ -1114,47 +1263,41 @@ class AlibabaLongRunningAdapter(BrowserAdapter):
         try:
             logger.info("🔐 Handling 2FA verification...")
             
-            # Wait for modal to appear
-            await self.page.wait_for_timeout(8000)
+            # Wait for the modal's code input to appear
+            await self._settle(selector=TWO_FACTOR_INPUT_SELECTOR, timeout=8000)
             
-            # Get 2FA code from email
+            # Get 2FA code from email, polling until it arrives
             logger.info("📧 Retrieving 2FA code from email...")
-            await asyncio.sleep(10)  # Wait for email to arrive
-            
-            code = self.email_reader.get_latest_alibaba_2fa_code(max_age_minutes=5, delete_after_use=True)
+            code = await self.email_reader.fetch_code(max_age_minutes=5, delete_after_use=True,
+                                                      since_uid=self._mail_mark)
             if not code:
                 logger.error("❌ No 2FA code found in email")
                 return False
             
             logger.info(f"✅ Found 2FA code: {code}")
             
-            # Use coordinate-based approach to fill verification code
-            logger.info("🎯 Using coordinate-based 2FA input...")
+            # Fill and submit through locators rather than fixed modal coordinates
+            code_input = self.page.locator(TWO_FACTOR_INPUT_SELECTOR).first
+            await code_input.wait_for(state="visible", timeout=5000)
+            await code_input.fill(code)
             
-            # Click on verification input field
-            await self.page.mouse.click(730, 360)
-            await self.page.wait_for_timeout(1000)
-            
-            # Type the code
-            await self.page.keyboard.type(code)
-            await self.page.wait_for_timeout(1000)
-            
-            # Click submit button
-            await self.page.mouse.click(685, 508)
-            await self.page.keyboard.press('Enter')  # Backup
+            submit_button = self.page.get_by_role("button", name=TWO_FACTOR_SUBMIT_RE).first
+            if await submit_button.count():
+                await submit_button.click()
+            else:
+                await code_input.press("Enter")
             
             # Wait for verification to complete
-            await self.page.wait_for_timeout(10000)
+            await self._settle(url=MESSENGER_URL_PATTERN, timeout=15000)
             
             logger.info("✅ 2FA verification completed")
             
             # Handle potential 400 redirect
-            await self.page.wait_for_timeout(5000)
             current_url = self.page.url
             
             if "400" in current_url or "error" in current_url:
                 logger.warning("⚠️  Detected 400 redirect after 2FA, waiting for final redirect...")
-                await self.page.wait_for_timeout(10000)
+                await self._settle(url=MESSENGER_URL_PATTERN, timeout=10000)
             
             return True
             
@@ -2,13 +2,107 @@
 """Alibaba message parser for better extraction and deduplication."""
 
 import re
+import json
+import functools
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import hashlib
 
+try:
+    import re2
+except ImportError:  # google-re2 is optional; the stdlib engine handles the same patterns
+    re2 = re
+
+from app.adapters.substring_matcher import SubstringMatcher
+
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns
+TIMESTAMP_RE = re.compile(r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2})')
+SENDER_RE = re.compile(r'^([A-Z][a-zA-Z\s]+):')
+
+# Lowercase markers of a reply line and of a sent message's element classes
+REPLY_INDICATORS = SubstringMatcher(['replied:', 'reply to:', 'wrote:', 'said:'])
+SENT_INDICATORS = SubstringMatcher(['sent', 'outgoing', 'self', 'right', 'my-message'])
+
+# UI elements removed from message content, each with a (lowercase) literal it cannot match
+# without. The passes run in order because earlier removals expose later matches (e.g.
+# "3 Pending Orders" leaves a bare "3" for the number pattern), so the patterns can't be fused
+# into one alternation; the literal check skips the passes that have nothing to remove.
+# These stay on the stdlib engine: RE2's \s, \d and case folding are ASCII-leaning and would
+# stop stripping labels followed by e.g. a non-breaking space.
+UI_PATTERNS = [(literal, re.compile(pattern, re.IGNORECASE | re.MULTILINE)) for literal, pattern in [
+    ('local time:', r'Local Time:.*?(?=\n|$)'),
+    ('waiting for supplier', r'Order\s+Waiting for supplier.*?(?=\n|$)'),
+    ('request modification', r'Request modification.*?(?=\n|$)'),
+    ('try a voice or video call', r'Try a voice or video call.*?(?=\n|$)'),
+    ('call', r'Call\s*$'),
+    ('read', r'Read\s*$'),
+    ('delivered', r'Delivered\s*$'),
+    ('replydownload', r'ReplyDownload.*?$'),
+    ('replytranslate', r'ReplyTranslate.*?$'),
+    ('replydownload', r'ReplyDownload\s*$'),
+    ('replytranslate', r'ReplyTranslate\s*$'),
+    ('usd', r'USD\s+\d+\.\d+'),
+    ('active project', r'To be shipped.*?Active Project'),
+    ('for buyer', r'For Buyer\s*$'),
+    ('for supplier', r'For Supplier\s*$'),
+    ('notice', r'Notice\s*$'),
+    ('pending orders', r'Pending Orders.*?$'),
+    ('new contact requests', r'New Contact Requests.*?$'),
+    ('new connections', r'New Connections.*?$'),
+    ('new quotes', r'New Quotes.*?$'),
+    ('rate supplier', r'Rate supplier.*?$'),
+    ('send order request', r'Send order request.*?$'),
+    ('file a complaint', r'File a complaint.*?$'),
+    ('logistics inquiry', r'Logistics Inquiry.*?$'),
+    ('press "enter" to send', r'Press "Enter" to send.*?$'),
+    ('send', r'Send\s*$'),
+    ('', r'^\d+\s*$'),  # Single numbers on a line
+]]
+
+# Bare UI labels that _clean_content would reduce to nothing; parse_message_element drops them up front
+UI_NOISE_TEXTS = frozenset({
+    'Send', 'Read', 'Call', 'Delivered', 'Notice', 'For Buyer', 'For Supplier',
+    'ReplyDownload', 'ReplyTranslate', 'Request modification', 'Try a voice or video call',
+    'Pending Orders', 'New Contact Requests', 'New Connections', 'New Quotes',
+    'Rate supplier', 'Send order request', 'File a complaint', 'Logistics Inquiry',
+    'Press "Enter" to send', 'Local Time:',
+})
+
+# Non-ASCII characters that re.IGNORECASE matches against ASCII letters
+IGNORECASE_ASCII_FOLDS = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+# Content that is nothing but a UI element
+UI_ONLY_RE = re.compile(
+    r'(ReplyDownload|ReplyTranslate|For Buyer|For Supplier|Notice|Send)'
+    r'|\d+\s+(Pending Orders|New Contact Requests|New Connections|New Quotes)'
+    r'|(Rate supplier|Send order request|File a complaint|Logistics Inquiry)',
+    re.IGNORECASE
+)
+
+# Bootstrap payload some pages embed with the whole message list
+JSON_MESSAGES_BLOB = '{"messages":'
+JSON_DECODER = json.JSONDecoder()
+
+# JSON-like message data embedded in the page's scripts. Every pattern starts at a
+# "content" key, paired here with how far before the key the pattern begins. They run over
+# the whole page, so they use RE2 (linear time, no backtracking on [^}]*) when available
+JSON_CONTENT_KEY = '"content":"'
+JSON_MESSAGE_PATTERNS = [(offset, re2.compile(pattern)) for offset, pattern in [
+    (0, r'"content":"([^"]+)"[^}]*"sendTime":(\d+)'),
+    (0, r'"content":"([^"]+)"[^}]*"messageId":"([^"]+)"'),
+    (1, r'{"content":"([^"]+)"[^}]*"sendTime":(\d+)[^}]*}'),
+]]
+
+
+def _fold_case(text: str) -> str:
+    """Lowercase text so that substring checks agree with re.IGNORECASE matching."""
+    if not text.isascii():
+        text = text.translate(IGNORECASE_ASCII_FOLDS)
+    return text.lower()
+
 
 class AlibabaMessageParser:
     """Parser for Alibaba messages with reply detection and deduplication."""
@@ -24,6 +118,10 @@ class AlibabaMessageParser:
         # Clean up the text
         text = text.strip()
         
+        # Skip bare UI labels before any regex work
+        if text in UI_NOISE_TEXTS:
+            return None
+        
         # Extract components
         sender_name, timestamp, content, is_reply, reply_to = self._extract_message_components(text)
         
@@ -50,7 +148,8 @@ class AlibabaMessageParser:
     
     def _extract_message_components(self, text: str) -> Tuple[Optional[str], Optional[str], Optional[str], bool, Optional[str]]:
         """Extract sender, timestamp, content, and reply info from message text."""
-        lines = text.split('\n')
+        # Strip every line once up front; the reply lookahead reads each line again
+        lines = [line.strip() for line in text.split('\n')]
         
         sender_name = None
         timestamp = None
@@ -58,57 +157,47 @@ class AlibabaMessageParser:
         is_reply = False
         reply_to = None
         
-        # Common patterns
-        timestamp_pattern = r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2})'
-        sender_pattern = r'^([A-Z][a-zA-Z\s]+):'
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Skip empty lines
-            if not line:
-                i += 1
+        quote_end = 0
+        for i, line in enumerate(lines):
+            # Skip lines already consumed as quoted content, and empty lines
+            if i < quote_end or not line:
                 continue
                 
             # Check for timestamp
-            timestamp_match = re.search(timestamp_pattern, line)
+            timestamp_match = TIMESTAMP_RE.search(line)
             if timestamp_match and not timestamp:
                 timestamp = timestamp_match.group(1)
                 # Remove timestamp from line
-                line = re.sub(timestamp_pattern, '', line).strip()
+                line = TIMESTAMP_RE.sub('', line).strip()
             
             # Check for sender name (Name: format)
-            sender_match = re.match(sender_pattern, line)
+            sender_match = SENDER_RE.match(line)
             if sender_match and not sender_name:
                 sender_name = sender_match.group(1).strip()
                 # Remove sender from line
                 line = line[len(sender_match.group(0)):].strip()
             
             # Check if this line starts a quoted/reply message
-            if i + 1 < len(lines) and lines[i + 1].strip().startswith('>'):
+            if i + 1 < len(lines) and lines[i + 1].startswith('>'):
                 is_reply = True
                 # The current line might be the reply content
                 if line:
                     content.append(line)
                 # Next lines starting with > are the quoted content
-                i += 1
-                quoted_lines = []
-                while i < len(lines) and lines[i].strip().startswith('>'):
-                    quoted_lines.append(lines[i].strip()[1:].strip())
-                    i += 1
-                reply_to = '\n'.join(quoted_lines)
+                quote_end = i + 1
+                while quote_end < len(lines) and lines[quote_end].startswith('>'):
+                    quote_end += 1
+                # Lines are already stripped, so only the space after the marker is left to drop
+                reply_to = '\n'.join([quoted[1:].lstrip() for quoted in lines[i + 1:quote_end]])
                 continue
             
             # Check for common reply indicators
-            if any(indicator in line.lower() for indicator in ['replied:', 'reply to:', 'wrote:', 'said:']):
+            if REPLY_INDICATORS.search(line.lower()):
                 is_reply = True
             
             # Add non-empty line to content
             if line:
                 content.append(line)
-            
-            i += 1
         
         # Join content
         content_str = '\n'.join(content).strip()
@@ -118,68 +207,36 @@ class AlibabaMessageParser:
         
         return sender_name, timestamp, content_str, is_reply, reply_to
     
-    def _clean_content(self, content: str) -> str:
-        """Clean message content by removing metadata and UI elements."""
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _clean_content(content: str) -> str:
+        """Clean message content by removing metadata and UI elements (cached: page boilerplate repeats)."""
         # Remove common UI elements
-        ui_patterns = [
-            r'Local Time:.*?(?=\n|$)',
-            r'Order\s+Waiting for supplier.*?(?=\n|$)',
-            r'Request modification.*?(?=\n|$)',
-            r'Try a voice or video call.*?(?=\n|$)',
-            r'Call\s*$',
-            r'Read\s*$',
-            r'Delivered\s*$',
-            r'ReplyDownload.*?$',
-            r'ReplyTranslate.*?$',
-            r'ReplyDownload\s*$',
-            r'ReplyTranslate\s*$',
-            r'USD\s+\d+\.\d+',
-            r'To be shipped.*?Active Project',
-            r'For Buyer\s*$',
-            r'For Supplier\s*$',
-            r'Notice\s*$',
-            r'Pending Orders.*?$',
-            r'New Contact Requests.*?$',
-            r'New Connections.*?$',
-            r'New Quotes.*?$',
-            r'Rate supplier.*?$',
-            r'Send order request.*?$',
-            r'File a complaint.*?$',
-            r'Logistics Inquiry.*?$',
-            r'Press "Enter" to send.*?$',
-            r'Send\s*$',
-            r'^\d+\s*$',  # Single numbers on a line
-        ]
-        
-        for pattern in ui_patterns:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE | re.MULTILINE)
+        lowered = _fold_case(content)
+        for literal, pattern in UI_PATTERNS:
+            if literal in lowered:
+                content, removed = pattern.subn('', content)
+                if removed:
+                    lowered = _fold_case(content)
         
         # Clean up extra whitespace
-        content = re.sub(r'\s+', ' ', content).strip()
+        content = ' '.join(content.split())
         
-        # Remove single letter lines (often UI artifacts)
-        lines = content.split('\n')
-        cleaned_lines = [line for line in lines if len(line.strip()) > 1 or line.strip() in ['ok', 'OK']]
-        content = '\n'.join(cleaned_lines)
+        # Remove single letter leftovers (often UI artifacts); the whitespace collapse above
+        # already joined everything into one stripped line
+        if len(content) < 2:
+            return ""
         
         # Filter out messages that are purely UI elements
-        ui_only_patterns = [
-            r'^(ReplyDownload|ReplyTranslate|For Buyer|For Supplier|Notice|Send)$',
-            r'^\d+\s+(Pending Orders|New Contact Requests|New Connections|New Quotes)$',
-            r'^(Rate supplier|Send order request|File a complaint|Logistics Inquiry)$'
-        ]
-        
-        for pattern in ui_only_patterns:
-            if re.match(pattern, content.strip(), re.IGNORECASE):
-                return ""  # Return empty string to indicate this should be filtered out
+        if UI_ONLY_RE.fullmatch(content):
+            return ""  # Return empty string to indicate this should be filtered out
         
-        return content.strip()
+        return content
     
     def _determine_if_sent(self, element_classes: str, text: str) -> bool:
         """Determine if message was sent by the user."""
         # Check classes for sent indicators
-        sent_indicators = ['sent', 'outgoing', 'self', 'right', 'my-message']
-        if any(indicator in element_classes.lower() for indicator in sent_indicators):
+        if SENT_INDICATORS.search(element_classes.lower()):
             return True
             
         # Check for "Daniel Allen:" in text (the user)
@@ -195,10 +252,13 @@ class AlibabaMessageParser:
     
     def _generate_message_id(self, content: str, timestamp: Optional[str], sender: Optional[str]) -> str:
         """Generate a unique message ID based on content and metadata."""
-        # Create a unique string from message components
-        unique_str = f"{content}:{timestamp or 'no-time'}:{sender or 'unknown'}"
-        # Generate hash
-        return f"msg_{hashlib.md5(unique_str.encode()).hexdigest()[:16]}"
+        # Hash the message components (MD5 on purpose: these ids end up in Message.platform_message_id,
+        # and changing the digest would make every previously synced message look new). The content
+        # is fed separately from the short suffix so it isn't copied into a joined string first;
+        # the digest is the same as hashing f"{content}:{timestamp}:{sender}"
+        digest = hashlib.md5(content.encode())
+        digest.update(f":{timestamp or 'no-time'}:{sender or 'unknown'}".encode())
+        return f"msg_{digest.hexdigest()[:16]}"
     
     def deduplicate_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove duplicate messages based on content and timestamp."""
@@ -207,7 +267,7 @@ class AlibabaMessageParser:
         
         for msg in messages:
             # Create a unique key based on content and timestamp
-            key = f"{msg.get('content', '')}:{msg.get('timestamp', '')}"
+            key = (msg.get('content', ''), msg.get('timestamp', ''))
             
             if key not in seen:
                 seen.add(key)
@@ -220,72 +280,86 @@ class AlibabaMessageParser:
     def extract_conversation_messages(self, page_text: str) -> List[Dict[str, Any]]:
         """Extract all messages from a conversation page."""
         messages = []
+        seen = set()
         
-        # First, try to extract messages from JavaScript/JSON data
-        js_messages = self._extract_from_javascript_data(page_text)
-        messages.extend(js_messages)
+        def add(msg: Dict[str, Any]):
+            # Deduplicate on content and timestamp as messages come in
+            key = (msg.get('content', ''), msg.get('timestamp', ''))
+            if key not in seen:
+                seen.add(key)
+                messages.append(msg)
+            else:
+                logger.debug(f"Skipping duplicate message: {msg.get('content', '')[:50]}...")
         
-        # Split by common message boundaries
-        # Look for patterns like timestamps followed by content
-        message_pattern = r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}[\s\S]*?)(?=\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}|$)'
+        # First, try to extract messages from JavaScript/JSON data
+        for msg in self._extract_from_javascript_data(page_text):
+            add(msg)
         
-        potential_messages = re.findall(message_pattern, page_text)
+        # Split by common message boundaries: each message runs from one
+        # timestamp up to the next one (or the end of the page)
+        boundaries = [match.start() for match in TIMESTAMP_RE.finditer(page_text)]
+        boundaries.append(len(page_text))
         
-        for msg_text in potential_messages:
-            parsed = self.parse_message_element(msg_text)
+        for start, end in zip(boundaries, boundaries[1:]):
+            parsed = self.parse_message_element(page_text[start:end])
             if parsed:
-                messages.append(parsed)
+                add(parsed)
         
         # Also try to find specific known messages
         if "ok,Daniel" in page_text:
             # Find context around ok,Daniel
-            ok_daniel_pattern = r'([\s\S]{0,200}ok,Daniel[\s\S]{0,100})'
-            matches = re.findall(ok_daniel_pattern, page_text)
+            matches = self._find_contexts(page_text, "ok,Daniel", before=200, after=100)
             
             for match in matches:
                 parsed = self.parse_message_element(match)
-                if parsed and parsed not in messages:
-                    messages.append(parsed)
+                if parsed:
+                    add(parsed)
         
-        return self.deduplicate_messages(messages)
+        return messages
+    
+    @staticmethod
+    def _find_contexts(text: str, needle: str, before: int, after: int) -> List[str]:
+        r"""Find the text around each occurrence of needle (same chunks as [\s\S]{0,before}needle[\s\S]{0,after})."""
+        contexts = []
+        pos = 0
+        while True:
+            index = text.find(needle, pos)
+            if index < 0:
+                return contexts
+            start = max(pos, index - before)
+            # The greedy leading context settles on the last occurrence it can reach
+            following = text.find(needle, index + 1, start + before + len(needle))
+            while following >= 0:
+                index = following
+                following = text.find(needle, index + 1, start + before + len(needle))
+            pos = min(len(text), index + len(needle) + after)
+            contexts.append(text[start:pos])
     
     def _extract_from_javascript_data(self, page_text: str) -> List[Dict[str, Any]]:
         """Extract messages from JavaScript data structures in the page."""
         messages = []
         
+        # Decode a real JSON payload directly when the page has one
+        items = self._find_json_messages_blob(page_text)
+        if items is not None:
+            for item in items:
+                if isinstance(item, dict) and isinstance(item.get('content'), str):
+                    key = item.get('sendTime') or item.get('messageId')
+                    message_data = self._build_javascript_message(item['content'], str(key) if key is not None else None)
+                    if message_data:
+                        messages.append(message_data)
+            return messages
+        
         # Look for JSON-like message data with specific patterns
-        json_patterns = [
-            r'"content":"([^"]+)"[^}]*"sendTime":(\d+)',
-            r'"content":"([^"]+)"[^}]*"messageId":"([^"]+)"',
-            r'{"content":"([^"]+)"[^}]*"sendTime":(\d+)[^}]*}',
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, page_text)
+        for matches in self._find_json_message_matches(page_text):
             for match in matches:
                 try:
                     if len(match) >= 2:
-                        content = match[0]
                         # Basic cleaning
-                        content = content.replace('\\n', '\n').replace('\\"', '"')
-                        
-                        # Skip if content is too short or looks like UI
-                        if len(content) < 2 or content in ['ok', 'Read', 'Send']:
-                            continue
-                        
-                        # Create a message object
-                        message_data = {
-                            'id': self._generate_message_id(content, str(match[1]) if len(match) > 1 else None, None),
-                            'content': content,
-                            'sender_name': None,  # Will be determined later
-                            'timestamp': self._convert_timestamp(match[1]) if len(match) > 1 and match[1].isdigit() else None,
-                            'is_sent': False,  # Default, will be determined later
-                            'direction': 'incoming',
-                            'is_reply': False,
-                            'reply_to_content': None,
-                            'raw_text': content
-                        }
-                        messages.append(message_data)
+                        content = match[0].replace('\\n', '\n').replace('\\"', '"')
+                        message_data = self._build_javascript_message(content, match[1])
+                        if message_data:
+                            messages.append(message_data)
                         
                 except Exception as e:
                     logger.debug(f"Error parsing JavaScript message: {e}")
@@ -293,8 +367,63 @@ class AlibabaMessageParser:
         
         return messages
     
-    def _convert_timestamp(self, timestamp_str: str) -> str:
-        """Convert JavaScript timestamp to ISO format."""
+    def _find_json_messages_blob(self, page_text: str) -> Optional[List[Any]]:
+        """Decode the page's {"messages": [...]} payload, or None if it has no usable one."""
+        index = page_text.find(JSON_MESSAGES_BLOB)
+        if index < 0:
+            return None
+        
+        try:
+            # raw_decode stops at the end of the object, wherever the script continues
+            data, _ = JSON_DECODER.raw_decode(page_text, index)
+        except ValueError as e:
+            logger.debug(f"Embedded message payload is not valid JSON: {e}")
+            return None
+        
+        items = data.get('messages')
+        return items if isinstance(items, list) else None
+    
+    def _build_javascript_message(self, content: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Build a message from embedded JSON content and its sendTime (or messageId)."""
+        # Skip if content is too short or looks like UI
+        if len(content) < 2 or content in ['ok', 'Read', 'Send']:
+            return None
+        
+        # Create a message object
+        return {
+            'id': self._generate_message_id(content, key, None),
+            'content': content,
+            'sender_name': None,  # Will be determined later
+            'timestamp': self._convert_timestamp(key) if key and key.isdigit() else None,
+            'is_sent': False,  # Default, will be determined later
+            'direction': 'incoming',
+            'is_reply': False,
+            'reply_to_content': None,
+            'raw_text': content
+        }
+    
+    def _find_json_message_matches(self, page_text: str) -> List[List[Tuple[str, ...]]]:
+        """Return each JSON_MESSAGE_PATTERNS pattern's findall() result from a single scan of page_text."""
+        matches = [[] for _ in JSON_MESSAGE_PATTERNS]
+        ends = [0] * len(JSON_MESSAGE_PATTERNS)
+        
+        # Patterns can only match at a "content" key, so find those once and try each
+        # pattern in place; like findall, a pattern skips keys inside its previous match
+        index = page_text.find(JSON_CONTENT_KEY)
+        while index >= 0:
+            for i, (offset, pattern) in enumerate(JSON_MESSAGE_PATTERNS):
+                start = index - offset
+                if start >= ends[i]:
+                    match = pattern.match(page_text, start)
+                    if match:
+                        matches[i].append(match.groups())
+                        ends[i] = match.end()
+            index = page_text.find(JSON_CONTENT_KEY, index + 1)
+        
+        return matches
+    
+    def _convert_timestamp(self, timestamp_str: str) -> Optional[str]:
+        """Convert JavaScript timestamp to ISO format, or None if it can't be converted."""
         try:
             if timestamp_str and timestamp_str.isdigit():
                 # JavaScript timestamps are in milliseconds
@@ -307,4 +436,5 @@ class AlibabaMessageParser:
         except Exception as e:
             logger.debug(f"Error converting timestamp {timestamp_str}: {e}")
         
-        return datetime.now().isoformat()
\ No newline at end of file
+        # Leave it unset like messages without a sendTime, rather than stamping it as brand new
+        return None
\ No newline at end of file
@@ -5,12 +5,11 @@ This adapter uses the actual API endpoints discovered from manual testing.
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import httpx
-import json
 import re
 from urllib.parse import urlencode, unquote
 import asyncio
 
-from app.adapters.base import PlatformAdapter, BrowserAdapter
+from app.adapters.base import PlatformAdapter, BrowserAdapter, json_dumps
 from app.core.config import settings
 
 
@@ -30,6 +29,8 @@ class AlibabaRealAdapter(PlatformAdapter):
     # WebSocket endpoint for real-time messaging
     WS_URL = "wss://wss-imakamai.alibaba.com/"
     
+    COOKIE_DOMAIN = "alibaba.com"
+    
     def __init__(self, account):
         super().__init__(account)
         self.csrf_token = None
@@ -119,7 +120,6 @@ class AlibabaRealAdapter(PlatformAdapter):
                     self.account.session_data = {
                         "csrf_token": self.csrf_token,
                         "user_id": self.user_id,
-                        "cookies": dict(self.client.cookies),
                     }
                     self._save_cookies()
                     return True
@@ -171,7 +171,7 @@ class AlibabaRealAdapter(PlatformAdapter):
             })
             
             data = {
-                "params": json.dumps(params),
+                "params": json_dumps(params).decode(),
                 "_csrf": self.csrf_token or ""
             }
             
@@ -1,20 +1,117 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
+import asyncio
 import httpx
 import json
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    orjson = None
+
+try:
+    import ciso8601
+except ImportError:  # ciso8601 is optional; fall back to datetime.fromisoformat
+    ciso8601 = None
+
+
+def json_loads(data: Any) -> Any:
+    """Decode JSON from bytes or str, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode an object as JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp (a trailing Z included), using ciso8601 when it is installed.
+
+    Results are cached: each sync re-reads the same visible messages, so their timestamp
+    strings repeat. datetimes are immutable, so sharing them is safe.
+    """
+    if ciso8601 is not None:
+        try:
+            return ciso8601.parse_datetime(value)
+        except ValueError:
+            pass  # Formats ciso8601 rejects still get fromisoformat's handling
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class LoopLocal:
+    """
+    Process-wide state that belongs to one event loop.
+
+    asyncio primitives and the Playwright driver can't outlive the loop they were
+    used on, so get() rebuilds the state with factory() whenever it is called from
+    a different loop than last time (e.g. a second asyncio.run() in the same process).
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._loop = None
+        self._value = None
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._value = loop, self._factory()
+        return self._value
+
+
+# One Playwright driver (a Node process) shared by every browser adapter on the loop
+_driver = LoopLocal(lambda: SimpleNamespace(lock=asyncio.Lock(), playwright=None))
+
+
+async def get_playwright():
+    """Return the shared Playwright instance, starting the driver on first use."""
+    driver = _driver.get()
+    async with driver.lock:
+        if driver.playwright is None:
+            from playwright.async_api import async_playwright
+            driver.playwright = await async_playwright().start()
+        return driver.playwright
+
+
+async def stop_playwright():
+    """Stop the shared Playwright driver; call once at process shutdown."""
+    driver = _driver.get()
+    async with driver.lock:
+        if driver.playwright is not None:
+            await driver.playwright.stop()
+            driver.playwright = None
+
 # from app.models import PlatformAccount  # Comment out to avoid DB dependency
 
 
 class PlatformAdapter(ABC):
     """Base class for platform adapters."""
     
+    __slots__ = ("account", "logger", "client")
+    
+    # Only cookies whose domain contains this are persisted (None keeps all)
+    COOKIE_DOMAIN: Optional[str] = None
+    
     def __init__(self, account):
         self.account = account
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
-        self.client = httpx.Client(
+        self.client = self._create_client()
+    
+    def _create_client(self) -> httpx.Client:
+        """Create the HTTP client used for platform requests."""
+        return httpx.Client(
             headers=self._get_default_headers(),
             cookies=self._load_cookies(),
             timeout=30.0,
@@ -42,7 +139,12 @@ class PlatformAdapter(ABC):
     
     def _save_cookies(self):
         """Save cookies to account session data."""
-        cookies = {k: v for k, v in self.client.cookies.items()}
+        cookies = {
+            cookie.name: cookie.value
+            for cookie in self.client.cookies.jar
+            # Cookies restored from session data carry no domain and are always kept
+            if self.COOKIE_DOMAIN is None or not cookie.domain or self.COOKIE_DOMAIN in cookie.domain
+        }
         if not self.account.session_data:
             self.account.session_data = {}
         self.account.session_data["cookies"] = cookies
@@ -85,16 +187,17 @@ class PlatformAdapter(ABC):
 class BrowserAdapter(PlatformAdapter):
     """Base class for adapters that need browser automation."""
     
+    __slots__ = ("page", "browser", "playwright")
+    
     def __init__(self, account):
         super().__init__(account)
         self.page = None
         self.browser = None
+        self.playwright = None
     
     async def init_browser(self):
         """Initialize Playwright browser."""
-        from playwright.async_api import async_playwright
-        
-        self.playwright = await async_playwright().start()
+        self.playwright = await get_playwright()
         self.browser = await self.playwright.chromium.launch(headless=True)
         context = await self.browser.new_context(
             user_agent=self._get_default_headers()["User-Agent"],
@@ -107,6 +210,23 @@ class BrowserAdapter(PlatformAdapter):
             
         self.page = await context.new_page()
     
+    async def _settle(self, selector: Optional[str] = None, url: Optional[str] = None, timeout: int = 5000):
+        """
+        Wait until the page reaches the expected state instead of sleeping a fixed time.
+
+        Waits for selector, for a navigation matching url, or otherwise for the network
+        to go idle. timeout caps the wait; a state that never arrives just ends it.
+        """
+        try:
+            if selector:
+                await self.page.wait_for_selector(selector, timeout=timeout)
+            elif url:
+                await self.page.wait_for_url(url, timeout=timeout)
+            else:
+                await self.page.wait_for_load_state("networkidle", timeout=timeout)
+        except Exception as e:
+            self.logger.debug(f"Page did not settle within {timeout}ms: {e}")
+    
     async def save_browser_state(self):
         """Save browser cookies and local storage."""
         if self.page:
@@ -120,6 +240,6 @@ class BrowserAdapter(PlatformAdapter):
         """Close browser and HTTP client."""
         if self.browser:
             await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        # The shared Playwright driver outlives adapters; see stop_playwright()
+        self.playwright = None
         super().close()
\ No newline at end of file
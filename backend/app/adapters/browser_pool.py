@@ -0,0 +1,225 @@
+"""Pool of persistent browser contexts shared by long-running adapters."""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from playwright.async_api import BrowserContext, Playwright
+
+from app.adapters.base import LoopLocal, get_playwright
+
+logger = logging.getLogger(__name__)
+
+
+def _browser_disconnected(context: BrowserContext) -> bool:
+    """True if the browser owning a non-persistent context has crashed or closed."""
+    # Persistent contexts have no Browser object; the health check probes their pages instead
+    browser = context.browser
+    return browser is not None and not browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Keeps persistent browser contexts open between adapter instances.
+
+    Contexts are keyed (e.g. by account id) because a persistent context is tied
+    to its user data directory. Adapters for the same key share one context;
+    contexts nobody holds are closed after ``idle_timeout`` (keeping at most
+    ``min_size`` of them warm), and the least recently used idle context is
+    evicted when ``max_size`` is reached. If every slot stays held for
+    ``acquire_timeout`` seconds, acquire() raises TimeoutError.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 0,
+        max_size: int = 4,
+        idle_timeout: float = 1800,
+        health_check_interval: float = 30,
+        acquire_timeout: float = 120,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._contexts: Dict[Any, BrowserContext] = {}
+        self._launching: Set[Any] = set()  # keys with a reserved slot whose launch is in flight
+        self._refcounts: Dict[Any, int] = {}
+        self._last_used: Dict[Any, float] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self._loop_state = LoopLocal(self._reset)
+
+    @property
+    def _condition(self) -> asyncio.Condition:
+        """The pool's lock, created on first use; a new event loop starts an empty pool."""
+        return self._loop_state.get()
+
+    def _reset(self) -> asyncio.Condition:
+        """Forget contexts from a previous event loop, which can no longer be used or closed."""
+        if self._contexts or self._launching:
+            logger.warning(f"Dropping {len(self._contexts)} browser contexts left over from a previous event loop")
+        self._contexts = {}
+        self._launching = set()
+        self._refcounts = {}
+        self._last_used = {}
+        self._health_task = None
+        return asyncio.Condition()
+
+    async def acquire(
+        self,
+        key: Any,
+        launch: Callable[[Playwright], Awaitable[BrowserContext]],
+    ) -> BrowserContext:
+        """Return the pooled context for key, launching it with launch() if needed."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+        async with self._condition:
+            while True:
+                context = self._contexts.get(key)
+                if context is not None and not _browser_disconnected(context):
+                    return self._hold(key, context)
+                if context is not None:
+                    logger.warning(f"⚠️  Browser behind the pooled context for {key} is gone, relaunching")
+                    await self._discard(key)
+                if key not in self._launching:
+                    if len(self._contexts) + len(self._launching) < self.max_size:
+                        # Reserve the slot; the launch itself runs without the lock
+                        self._launching.add(key)
+                        break
+                    if await self._evict_idle():
+                        continue
+                # Wait for a release, an eviction or another task's launch of this key
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No browser context available for {key} after {self.acquire_timeout}s: "
+                        f"all {self.max_size} pooled contexts are in use"
+                    )
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        try:
+            context = await launch(await get_playwright())
+        except BaseException:
+            async with self._condition:
+                self._launching.discard(key)
+                self._condition.notify_all()
+            raise
+
+        async with self._condition:
+            self._launching.discard(key)
+            self._contexts[key] = context
+            logger.info(f"🌐 Launched pooled browser context for {key} ({len(self._contexts)}/{self.max_size})")
+            self._condition.notify_all()
+            return self._hold(key, context)
+
+    def _hold(self, key: Any, context: BrowserContext) -> BrowserContext:
+        """Count a new holder of key's context. Caller holds the lock."""
+        self._refcounts[key] = self._refcounts.get(key, 0) + 1
+        self._last_used[key] = time.monotonic()
+
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_check_loop())
+        return context
+
+    async def release(self, key: Any):
+        """Return a context to the pool; it stays open until it idles out."""
+        async with self._condition:
+            if key not in self._refcounts:
+                return
+            self._refcounts[key] -= 1
+            self._last_used[key] = time.monotonic()
+            if self._refcounts[key] <= 0:
+                del self._refcounts[key]
+                self._condition.notify_all()
+
+    async def close(self):
+        """Close every pooled context."""
+        condition = self._condition  # resets the pool first if it was used on another loop
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        async with condition:
+            for key in list(self._contexts):
+                await self._discard(key)
+
+    async def _evict_idle(self) -> bool:
+        """Close the least recently used idle context. Caller holds the lock."""
+        idle = [key for key in self._contexts if key not in self._refcounts]
+        if not idle:
+            return False
+        await self._discard(min(idle, key=self._last_used.__getitem__))
+        return True
+
+    async def _discard(self, key: Any):
+        """Drop a context from the pool and close it. Caller holds the lock."""
+        context = self._pop(key)
+        if context is not None:
+            await self._close_context(key, context)
+
+    def _pop(self, key: Any) -> Optional[BrowserContext]:
+        """Drop key from the pool without closing its context. Caller holds the lock."""
+        context = self._contexts.pop(key, None)
+        self._refcounts.pop(key, None)
+        self._last_used.pop(key, None)
+        self._condition.notify_all()
+        return context
+
+    async def _close_context(self, key: Any, context: BrowserContext):
+        """Close a context already dropped from the pool; needs no lock."""
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled browser context for {key}: {e}")
+
+    async def _is_responsive(self, key: Any, context: BrowserContext) -> bool:
+        """Probe an idle context's first page, giving up after one check interval."""
+        if _browser_disconnected(context):
+            logger.warning(f"⚠️  Browser behind the pooled context for {key} is gone, dropping it")
+            return False
+        try:
+            pages = context.pages
+            if pages:
+                await asyncio.wait_for(pages[0].evaluate("1"), self.health_check_interval)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Pooled browser context for {key} is unresponsive, dropping it: {e!r}")
+            return False
+
+    async def _health_check_loop(self):
+        """Close idled-out contexts and drop idle ones whose browser has crashed."""
+        while self._contexts:
+            await asyncio.sleep(self.health_check_interval)
+            # Snapshot under the lock; probing and closing happen outside it so a hung
+            # page can't block acquire() and release()
+            expired, probed = [], []
+            async with self._condition:
+                now = time.monotonic()
+                idle = sorted(
+                    (key for key in self._contexts if key not in self._refcounts),
+                    key=self._last_used.__getitem__,
+                )
+                for index, key in enumerate(idle):
+                    if len(idle) - index > self.min_size and now - self._last_used[key] > self.idle_timeout:
+                        expired.append((key, self._pop(key)))
+                    else:
+                        probed.append((key, self._contexts[key]))
+
+            for key, context in expired:
+                logger.info(f"🧹 Closing idle browser context for {key}")
+                await self._close_context(key, context)
+
+            dead = [(key, context) for key, context in probed if not await self._is_responsive(key, context)]
+            if not dead:
+                continue
+            async with self._condition:
+                # Skip contexts that were acquired or replaced while being probed
+                dead = [
+                    (key, self._pop(key)) for key, context in dead
+                    if self._contexts.get(key) is context and key not in self._refcounts
+                ]
+            for key, context in dead:
+                await self._close_context(key, context)
@@ -0,0 +1,37 @@
+"""Single-pass multi-substring matching for adapter text scans."""
+import re
+from typing import Iterable, Optional
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to a regex alternation
+    ahocorasick = None
+
+
+class SubstringMatcher:
+    """Finds any of a fixed set of substrings in one linear pass over the text."""
+
+    __slots__ = ("_automaton", "_pattern")
+
+    def __init__(self, words: Iterable[str]):
+        words = list(words)
+        self._automaton = None
+        self._pattern = None
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word in words:
+                self._automaton.add_word(word, word)
+            self._automaton.make_automaton()
+        else:
+            self._pattern = re.compile('|'.join(map(re.escape, words)))
+
+    def search(self, text: str) -> Optional[str]:
+        """Return a substring from the set found in text, or None."""
+        if self._automaton is not None:
+            for _, word in self._automaton.iter(text):
+                return word
+            return None
+
+        match = self._pattern.search(text)
+        return match.group(0) if match else None
@@ -1,10 +1,33 @@
+import json
+
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
-engine = create_engine(str(settings.DATABASE_URL), pool_pre_ping=True)
+try:
+    import orjson
+except ImportError:  # orjson is optional; SQLAlchemy's stdlib json is used instead
+    orjson = None
+
+
+def _json_serializer(obj) -> str:
+    """Serialize JSON columns (session_data, platform_data, ...) with orjson when possible."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # Types orjson rejects still get the stdlib's behaviour
+    return json.dumps(obj)
+
+
+engine = create_engine(
+    str(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads if orjson is not None else json.loads,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 metadata = MetaData()
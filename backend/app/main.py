@@ -6,6 +6,7 @@ from app.core.config import settings
 from app.api.v1.api import api_router
 from app.db.base import engine, Base
 from app.db.init_db import *  # Ensure all models are imported
+from app.adapters.base import stop_playwright
 
 
 @asynccontextmanager
@@ -14,6 +15,7 @@ async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
     yield
     # Shutdown
+    await stop_playwright()
 
 
 app = FastAPI(
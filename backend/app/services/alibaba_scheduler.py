@@ -9,7 +9,13 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from sqlalchemy.orm import Session
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (installed with uvicorn[standard]); asyncio's loop works the same
+    uvloop = None
+
 from app.services.alibaba_sync import AlibabaSyncService
+from app.adapters.base import stop_playwright
 from app.models import PlatformAccount, Platform
 from app.db.base import SessionLocal
 
@@ -250,8 +256,11 @@ async def main():
         logger.info("Received keyboard interrupt")
     finally:
         scheduler.stop()
+        await stop_playwright()
         logger.info("Scheduler stopped")
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
@@ -12,6 +12,7 @@ from app.models import PlatformAccount, Chat, Message, Profile
 from app.models.message import MessageDirection, MessageStatus
 from app.adapters.alibaba_production import AlibabaProductionAdapter
 from app.adapters.alibaba_longrunning import AlibabaLongRunningAdapter
+from app.adapters.base import parse_timestamp
 from app.db.base import SessionLocal
 
 logger = logging.getLogger(__name__)
@@ -277,9 +278,7 @@ class AlibabaSyncService:
                 existing_chat.unread_count = conv_data.get('unread_count', 0)
                 if conv_data.get('last_message_time'):
                     try:
-                        existing_chat.last_message_at = datetime.fromisoformat(
-                            conv_data['last_message_time'].replace('Z', '+00:00')
-                        )
+                        existing_chat.last_message_at = parse_timestamp(conv_data['last_message_time'])
                     except:
                         pass
                 self.db.commit()
@@ -297,9 +296,7 @@ class AlibabaSyncService:
             # Set last message time if available
             if conv_data.get('last_message_time'):
                 try:
-                    chat.last_message_at = datetime.fromisoformat(
-                        conv_data['last_message_time'].replace('Z', '+00:00')
-                    )
+                    chat.last_message_at = parse_timestamp(conv_data['last_message_time'])
                 except:
                     pass
             
@@ -346,9 +343,7 @@ class AlibabaSyncService:
                 # Set timestamp
                 if msg_data.get('timestamp'):
                     try:
-                        message.platform_timestamp = datetime.fromisoformat(
-                            msg_data['timestamp'].replace('Z', '+00:00')
-                        )
+                        message.platform_timestamp = parse_timestamp(msg_data['timestamp'])
                     except:
                         message.platform_timestamp = datetime.utcnow()
                 else:
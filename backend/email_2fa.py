@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """IMAP email reader for 2FA codes."""
+import asyncio
 import imaplib
 import email
 import re
@@ -8,6 +9,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
+try:
+    import aioimaplib
+except ImportError:  # fetch_code polls for the 2FA email without it
+    aioimaplib = None
+
 logger = logging.getLogger(__name__)
 
 class EmailTwoFactorReader:
@@ -39,13 +45,48 @@ class EmailTwoFactorReader:
             except:
                 pass
                 
-    def get_latest_alibaba_2fa_code(self, max_age_minutes: int = 5, delete_after_use: bool = True) -> Optional[str]:
+    def _select_folder(self):
+        """Select the specified folder (inbox or 2FA folder), falling back to INBOX."""
+        logger.info(f"📂 Selecting folder: {self.folder}")
+        try:
+            self.mail.select(self.folder)
+        except Exception as e:
+            if self.folder != "INBOX":
+                logger.warning(f"⚠️  Folder '{self.folder}' not found, falling back to INBOX: {e}")
+                self.folder = "INBOX"
+                self.mail.select(self.folder)
+            else:
+                raise e
+
+    def mark_new_mail(self) -> Optional[int]:
+        """
+        Get the UID the next email delivered to the folder will receive (its UIDNEXT).
+
+        Take the mark before triggering a 2FA email and pass it as since_uid so that
+        codes from earlier emails are never accepted.
+        """
+        try:
+            if not self.connect():
+                return None
+            self._select_folder()
+            typ, data = self.mail.status(self.folder, '(UIDNEXT)')
+            match = re.search(rb'UIDNEXT (\d+)', data[0]) if typ == 'OK' else None
+            return int(match.group(1)) if match else None
+        except Exception as e:
+            logger.warning(f"Could not read UIDNEXT for {self.folder}: {e}")
+            return None
+        finally:
+            self.disconnect()
+
+    def get_latest_alibaba_2fa_code(self, max_age_minutes: int = 5, delete_after_use: bool = True,
+                                    since_uid: Optional[int] = None) -> Optional[str]:
         """
         Get the latest 2FA code from Alibaba emails and optionally delete the email.
         
         Args:
             max_age_minutes: Only look for emails newer than this many minutes
             delete_after_use: Whether to delete the email after extracting the code
+            since_uid: Only accept emails with at least this UID (see mark_new_mail)
             
         Returns:
             2FA code if found, None otherwise
@@ -54,17 +95,7 @@ class EmailTwoFactorReader:
             if not self.connect():
                 return None
                 
-            # Select the specified folder (inbox or 2FA folder)
-            logger.info(f"📂 Selecting folder: {self.folder}")
-            try:
-                self.mail.select(self.folder)
-            except Exception as e:
-                if self.folder != "INBOX":
-                    logger.warning(f"⚠️  Folder '{self.folder}' not found, falling back to INBOX: {e}")
-                    self.folder = "INBOX"
-                    self.mail.select(self.folder)
-                else:
-                    raise e
+            self._select_folder()
             
             # Search for recent emails from Alibaba
             since_date = (datetime.now() - timedelta(minutes=max_age_minutes)).strftime("%d-%b-%Y")
@@ -78,12 +109,19 @@ class EmailTwoFactorReader:
                 f'(SINCE "{since_date}" SUBJECT "security")',
             ]
             
+            # SINCE only has day granularity; a UID range pins the search to mail that
+            # arrived after the mark
+            uid_range = [f'UID {since_uid}:*'] if since_uid else []
+            
             for criteria in search_criteria:
                 logger.info(f"Searching with criteria: {criteria}")
-                typ, data = self.mail.search(None, criteria)
+                typ, data = self.mail.uid('SEARCH', *uid_range, criteria)
                 
                 if typ == 'OK' and data[0]:
                     email_ids = data[0].split()
+                    if since_uid:
+                        # "n:*" always matches the newest email, even when its UID is below n
+                        email_ids = [email_id for email_id in email_ids if int(email_id) >= since_uid]
                     logger.info(f"Found {len(email_ids)} emails matching criteria")
                     
                     # Check emails from newest to oldest
@@ -95,7 +133,7 @@ class EmailTwoFactorReader:
                             # Delete the email after successful code extraction
                             if delete_after_use:
                                 try:
-                                    self.mail.store(email_id, '+FLAGS', '\\Deleted')
+                                    self.mail.uid('STORE', email_id, '+FLAGS', '\\Deleted')
                                     self.mail.expunge()
                                     logger.info(f"🗑️  Deleted used 2FA email {email_id.decode()}")
                                 except Exception as e:
@@ -113,10 +151,10 @@ class EmailTwoFactorReader:
             self.disconnect()
     
     def _extract_code_from_email(self, email_id: bytes) -> Optional[str]:
-        """Extract 2FA code from a specific email."""
+        """Extract 2FA code from the email with this UID."""
         try:
             # Fetch the email
-            typ, data = self.mail.fetch(email_id, '(RFC822)')
+            typ, data = self.mail.uid('FETCH', email_id, '(RFC822)')
             if typ != 'OK':
                 return None
                 
@@ -209,6 +247,117 @@ class EmailTwoFactorReader:
                 
         return body.strip()
 
+class PersistentEmailTwoFactorReader(EmailTwoFactorReader):
+    """EmailTwoFactorReader that keeps its IMAP session open between lookups."""
+
+    POLL_INTERVAL = 2  # seconds between searches when the server can't push new mail
+    IDLE_TIMEOUT = 300  # re-issue IDLE well inside the server's 29 minute limit
+
+    def connect(self) -> bool:
+        """Reuse the open IMAP session, reconnecting only if it has dropped."""
+        if self.mail:
+            try:
+                if self.mail.noop()[0] == 'OK':
+                    return True
+            except Exception as e:
+                logger.info(f"IMAP session dropped, reconnecting: {e}")
+            self.mail = None
+        return super().connect()
+
+    def disconnect(self):
+        """Keep the session open for the next lookup; use logout() to close it."""
+
+    def logout(self):
+        """Close the IMAP session."""
+        super().disconnect()
+        self.mail = None
+
+    async def _open_idle_session(self):
+        """
+        Open a second, asynchronous session on the folder to IDLE (RFC 2177) in.
+
+        Returns None when aioimaplib isn't installed or the server can't IDLE,
+        in which case fetch_code polls every POLL_INTERVAL seconds instead.
+        """
+        if aioimaplib is None:
+            return None
+        client = aioimaplib.IMAP4_SSL(self.imap_server)
+        try:
+            await client.wait_hello_from_server()
+            await client.login(self.email_address, self.password)
+            # Servers commonly advertise IDLE only once authenticated
+            await client.protocol.capability()
+            if not client.has_capability('IDLE'):
+                logger.info("IMAP server does not support IDLE, polling for the 2FA email")
+            elif (await client.select(self.folder)).result == 'OK' or \
+                    (await client.select('INBOX')).result == 'OK':
+                return client
+        except Exception as e:
+            logger.info(f"IMAP IDLE session unavailable, polling for the 2FA email: {e}")
+        await self._close_idle_session(client)
+        return None
+
+    async def _close_idle_session(self, client):
+        """End any running IDLE and log the session out."""
+        try:
+            if client.has_pending_idle():
+                client.idle_done()
+            await client.logout()
+        except Exception as e:
+            logger.debug(f"Error closing IMAP IDLE session: {e}")
+
+    async def _wait_for_new_mail(self, client, idle, timeout: float):
+        """Wait until the running IDLE reports new mail or timeout passes, then end the IDLE."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                lines = await client.wait_server_push(remaining)
+                if lines == aioimaplib.STOP_WAIT_SERVER_PUSH or \
+                        any(line.endswith((b'EXISTS', b'RECENT')) for line in lines):
+                    break
+        except asyncio.TimeoutError:
+            pass
+        client.idle_done()
+        await asyncio.wait_for(idle, client.timeout)
+
+    async def fetch_code(self, max_age_minutes: int = 5, delete_after_use: bool = True,
+                         timeout: float = 30, since_uid: Optional[int] = None) -> Optional[str]:
+        """Wait for a 2FA code, searching again whenever the server pushes new mail."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        client = await self._open_idle_session()
+        try:
+            while True:
+                # IDLE starts before the search so mail arriving during it is still pushed
+                idle = None
+                if client:
+                    try:
+                        idle = await client.idle_start(timeout=self.IDLE_TIMEOUT)
+                    except Exception as e:
+                        logger.info(f"IMAP IDLE failed, falling back to polling: {e}")
+                        await self._close_idle_session(client)
+                        client = None
+
+                code = await asyncio.to_thread(self.get_latest_alibaba_2fa_code, max_age_minutes,
+                                               delete_after_use, since_uid)
+                remaining = deadline - loop.time()
+                if code or remaining <= 0:
+                    return code
+
+                if not idle:
+                    await asyncio.sleep(min(self.POLL_INTERVAL, remaining))
+                    continue
+                try:
+                    await self._wait_for_new_mail(client, idle, remaining)
+                except Exception as e:
+                    logger.info(f"IMAP IDLE interrupted, falling back to polling: {e}")
+                    await self._close_idle_session(client)
+                    client = None
+        finally:
+            if client:
+                await self._close_idle_session(client)
+
 def test_email_reader():
     """Test the email reader functionality."""
     # Use your credentials
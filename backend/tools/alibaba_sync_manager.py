@@ -13,6 +13,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from app.services.alibaba_sync import AlibabaSyncService
 from app.services.alibaba_scheduler import AlibabaSchedulerService
+from app.adapters.alibaba_browser import BROWSER_POOL
+from app.adapters.base import stop_playwright
 from app.models import PlatformAccount, Platform, Chat, Message
 from app.db.base import SessionLocal
 
@@ -264,6 +266,9 @@ async def main():
         print(f"❌ Error: {e}")
     finally:
         manager.close()
+        # Chromium and the driver would otherwise outlive the command
+        await BROWSER_POOL.close()
+        await stop_playwright()
 
 
 if __name__ == "__main__":
@@ -154,6 +154,17 @@ async def run_database_sync(interval_minutes: int = 5):
         return False
 
 
+async def shutdown_browser():
+    """Close the pooled browser contexts and the Playwright driver the adapters share."""
+    try:
+        from app.adapters.alibaba_browser import BROWSER_POOL
+        from app.adapters.base import stop_playwright
+    except ImportError:
+        return
+    await BROWSER_POOL.close()
+    await stop_playwright()
+
+
 async def main():
     """Main entry point."""
     import argparse
@@ -169,12 +180,16 @@ async def main():
         logger.error("❌ EMAIL_PASSWORD environment variable not set")
         return
     
-    if args.command == "test":
-        await run_adapter_test()
-    elif args.command == "sync":
-        await run_periodic_sync(args.interval)
-    elif args.command == "database":
-        await run_database_sync(args.interval)
+    try:
+        if args.command == "test":
+            await run_adapter_test()
+        elif args.command == "sync":
+            await run_periodic_sync(args.interval)
+        elif args.command == "database":
+            await run_database_sync(args.interval)
+    finally:
+        # Chromium and the driver would otherwise outlive the command
+        await shutdown_browser()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.adapters.alibaba_real import AlibabaRealAdapter, AlibabaRealBrowserAdapter
+from app.adapters.base import stop_playwright
 from app.models.platform_account import PlatformAccount
 from app.core.config import settings
 import json
@@ -205,14 +206,18 @@ async def main():
     
     tester = AlibabaManualTester()
     
-    if not await tester.setup():
-        return
-        
-    # Run interactive testing
-    await tester.interactive_testing()
-    
-    print("\n✅ Testing complete!")
-    print("Check logs/ directory for saved responses")
+    try:
+        if not await tester.setup():
+            return
+            
+        # Run interactive testing
+        await tester.interactive_testing()
+        
+        print("\n✅ Testing complete!")
+        print("Check logs/ directory for saved responses")
+    finally:
+        # The browser adapter's Playwright driver would otherwise outlive the script
+        await stop_playwright()
 
 
 if __name__ == "__main__":